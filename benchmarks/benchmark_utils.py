@@ -0,0 +1,147 @@
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+import subprocess
+import contextlib
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+CONFIGS_PATH = os.path.join(ROOT, 'textureimporter', 'configs')
+
+CHANNELS = ['BaseColor', 'Metalness', 'Roughness', 'Normal', 'Height', 'Emissive', 'Opacity', 'Unused']
+
+
+def generate_file_names(count, udims=10, extensions=('png', 'tx'), materials_per_folder=0):
+    """Generates texture file names like the ones exported by Substance Painter.
+
+    Args:   count: the number of file names
+            udims: the number of udim tiles per channel, 0 creates files without udims
+            extensions: materials cycle through the extensions to hit optional groups
+            materials_per_folder: moves materials into subfolders, 0 keeps them in the root
+    """
+
+    file_names = []
+    material = 0
+    while len(file_names) < count:
+        material_name = 'material{:05d}'.format(material)
+        extension = extensions[material % len(extensions)]
+        directory = ''
+        if materials_per_folder:
+            directory = 'set{:03d}'.format(material // materials_per_folder)
+
+        for channel in CHANNELS:
+            if udims:
+                for udim in range(udims):
+                    file_name = '{}_{}.{}.{}'.format(material_name, channel, 1001 + udim, extension)
+                    file_names.append(os.path.join(directory, file_name))
+            else:
+                file_name = '{}_{}.{}'.format(material_name, channel, extension)
+                file_names.append(os.path.join(directory, file_name))
+        material += 1
+    return file_names[:count]
+
+
+def create_files(root, file_names):
+    for file_name in file_names:
+        path = os.path.join(root, file_name)
+        directory = os.path.dirname(path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        open(path, 'w').close()
+
+
+@contextlib.contextmanager
+def texture_tree(file_names):
+    # creates a temporary folder with empty texture files
+    path = tempfile.mkdtemp(prefix='textureimporter_benchmark')
+    try:
+        create_files(path, file_names)
+        yield path
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def timeit(func, repeat=3):
+    # returns the fastest time in seconds and the result of the last run
+    timings = []
+    result = None
+    for i in range(repeat):
+        start_time = time.time()
+        result = func()
+        timings.append(time.time() - start_time)
+    return min(timings), result
+
+
+def revision():
+    try:
+        output = subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, stderr=subprocess.STDOUT)
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+    return output.decode('utf-8').strip()
+
+
+def environment():
+    data = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'executable': os.path.basename(sys.executable or ''),
+        'revision': revision(),
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    return data
+
+
+def write_results(name, results, output=None):
+    data = {
+        'benchmark': name,
+        'environment': environment(),
+        'results': results,
+    }
+    if output:
+        with open(output, 'w') as f:
+            json.dump(data, f, indent=4)
+    else:
+        json.dump(data, sys.stdout, indent=4)
+        sys.stdout.write('\n')
+    return data
+
+
+def compare_results(results, baseline_path, key, metrics, threshold=1.2):
+    """Compares results with a previous json output and returns the regressions.
+
+    Results are matched by the value of key, every metric that is higher than
+    the baseline by more than the threshold factor counts as a regression.
+    """
+
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    baseline_results = {result.get(key): result for result in baseline.get('results', [])}
+
+    regressions = []
+    for result in results:
+        baseline_result = baseline_results.get(result.get(key))
+        if not baseline_result:
+            continue
+        for name in metrics:
+            value = result.get(name)
+            baseline_value = baseline_result.get(name)
+            if value is None or not baseline_value:
+                continue
+            if value > baseline_value * threshold:
+                regressions.append('{}={}: {} {:.4f} -> {:.4f}'.format(
+                    key, result[key], name, baseline_value, value))
+    return regressions
+
+
+def report_regressions(regressions):
+    for regression in regressions:
+        sys.stderr.write('Regression: {}\n'.format(regression))
+    return 1 if regressions else 0
@@ -0,0 +1,62 @@
+"""Measures how classifying file names scales with the number of processes.
+
+Usage:  python benchmarks/classification.py --files 200000 --processes 1 2 4 8
+"""
+
+import argparse
+
+import benchmark_utils
+
+from textureimporter import pattern_utils  # noqa: E402
+
+
+PATTERNS = [
+    '$material_BaseColor(.$udim).*',
+    '$material_Metalness(.$udim).*',
+    '$material_Roughness(.$udim).*',
+    '$material_Normal(.$udim).*',
+    '$material_Height(.$udim).*',
+    '$material_Emissive(.$udim).*',
+    '$material_Opacity.(tx|exr|png|*)',
+]
+
+
+def benchmark(file_names, processes, repeat=3):
+    def classify():
+        if processes > 1:
+            return pattern_utils.classify_parallel(
+                PATTERNS, file_names, processes=processes, min_shard_size=1)
+        classification = pattern_utils.Classification(PATTERNS)
+        classification.extend(file_names)
+        return classification
+
+    classify_time, classification = benchmark_utils.timeit(classify, repeat)
+    result = {
+        'files': len(file_names),
+        'processes': processes,
+        'materials': len(classification.materials),
+        'time': classify_time,
+    }
+    return result
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=200000)
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='write the json results to this path')
+    args = parser.parse_args(args)
+
+    file_names = benchmark_utils.generate_file_names(args.files)
+    results = [benchmark(file_names, processes, args.repeat) for processes in args.processes]
+
+    baseline = results[0]['time']
+    for result in results:
+        result['speedup'] = baseline / result['time'] if result['time'] else 0
+
+    benchmark_utils.write_results('classification', results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""Counts the dcc calls per network for every renderer plugin.
+
+Usage:  python benchmarks/creation.py --networks 100 --output creation.json
+        python benchmarks/creation.py --baseline creation.json
+
+maya.cmds, maya.mel and pymxs are replaced with the in-memory stand-ins from
+fake_dcc, so the numbers show the round trips and python overhead of the plugins,
+not the cost of the commands inside the dcc. Needs PySide2, mayapy works as well.
+"""
+
+import os
+import sys
+import argparse
+
+import benchmark_utils
+import fake_dcc
+
+dcc = fake_dcc.install()
+
+from textureimporter import importer  # noqa: E402
+from textureimporter import plugin_utils  # noqa: E402
+
+
+# configs that are used for each plugin, None builds the channels from the attributes
+PLUGIN_CONFIGS = {
+    'maya_arnold': 'Arnold',
+    'maya_vray': 'VRay (Metalness Roughness)',
+    'maya_redshift': None,
+    'max_arnold': 'Arnold (3dsMax)',
+    'max_vray': 'VRay (3dsMax)',
+}
+
+REDSHIFT_ATTRIBUTES = [
+    'diffuse_color', 'refl_metalness', 'refl_roughness', 'normal_input', 'displacement', 'emission_color']
+
+METRICS = ('time', )
+
+
+def load_config(plugin, texture_importer):
+    name = PLUGIN_CONFIGS.get(plugin)
+    if name:
+        return importer.Config.from_json(os.path.join(benchmark_utils.CONFIGS_PATH, '{}.json'.format(name)))
+
+    config = importer.Config(plugin)
+    colorspace = texture_importer.colorspaces[0] if texture_importer.colorspaces else ''
+    for attribute in REDSHIFT_ATTRIBUTES:
+        config.channels.append(importer.ConfigChannel(
+            attribute=attribute, pattern='$material_{}.png'.format(attribute), colorspace=colorspace))
+    return config
+
+
+def create_networks(texture_importer, config, count):
+    # the same networks that get_networks returns for a folder with every channel
+    networks = []
+    for i in range(count):
+        material_name = 'material{:05d}'.format(i)
+        network = importer.Network()
+        network.material = material_name
+        network.material_name = material_name
+        network.material_node_name = texture_importer.resolve_name('material_node_pattern', material_name)
+        for channel in config.channels:
+            network_channel = importer.NetworkChannel(network)
+            network_channel.attribute_name = channel.attribute
+            network_channel.colorspace = channel.colorspace
+            network_channel.file_node_name = texture_importer.resolve_name(
+                'file_node_pattern', '{}_{}'.format(material_name, channel.attribute))
+            network_channel.file_path = '/textures/{}_{}.<UDIM>.png'.format(material_name, channel.attribute)
+        networks.append(network)
+    return networks
+
+
+def benchmark(plugin, count, on_conflict='rename', assign_material=False, meshes=10, repeat=3):
+    texture_importer = importer.Importer.from_plugin(plugin)
+    if type(texture_importer) is importer.Importer:
+        raise RuntimeError('Could not import plugin: {}'.format(plugin))
+    config = load_config(plugin, texture_importer)
+    networks = create_networks(texture_importer, config, count)
+    kwargs = {
+        'on_conflict': on_conflict,
+        'assign_material': assign_material,
+    }
+
+    def create():
+        dcc.reset()
+        dcc.create_meshes(meshes)
+        texture_importer.create_networks(networks, **kwargs)
+
+    create_time, _ = benchmark_utils.timeit(create, repeat)
+    # the calls of the last run
+    calls = dict(dcc.calls)
+
+    result = {
+        'plugin': plugin,
+        'networks': count,
+        'channels': len(config.channels),
+        'time': create_time,
+        'calls_per_network': float(sum(calls.values())) / count,
+    }
+    for name, value in sorted(calls.items()):
+        result[name] = float(value) / count
+    return result
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--plugins', nargs='+', default=sorted(PLUGIN_CONFIGS))
+    parser.add_argument('--networks', type=int, default=100)
+    parser.add_argument(
+        '--on-conflict', default='rename', choices=('remove', 'replace', 'rename'),
+        help='how to handle existing nodes')
+    parser.add_argument('--assign-material', action='store_true', help='assign materials')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='write the json results to this path')
+    parser.add_argument('--baseline', help='compare with the json results of a previous run')
+    parser.add_argument('--threshold', type=float, default=1.2, help='slowdown factor that fails')
+    args = parser.parse_args(args)
+
+    results = []
+    for plugin in args.plugins:
+        if not plugin_utils.render_plugin(*plugin.split('_', 1)):
+            sys.stderr.write('Unknown plugin: {}\n'.format(plugin))
+            continue
+        results.append(benchmark(
+            plugin, args.networks,
+            on_conflict=args.on_conflict,
+            assign_material=args.assign_material,
+            repeat=args.repeat))
+
+    benchmark_utils.write_results('creation', results, args.output)
+
+    if args.baseline:
+        # any additional call is a regression, timings can vary by the threshold
+        call_metrics = set()
+        for result in results:
+            call_metrics.update(name for name in result if name.startswith(('calls', 'cmds.', 'mel.', 'rt.')))
+        regressions = benchmark_utils.compare_results(
+            results, args.baseline, 'plugin', sorted(call_metrics), threshold=1.0)
+        regressions.extend(benchmark_utils.compare_results(
+            results, args.baseline, 'plugin', METRICS, args.threshold))
+        return benchmark_utils.report_regressions(regressions)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""Times network discovery on synthetic texture folders.
+
+Usage:  python benchmarks/discovery.py --sizes 1000 10000 100000 --output discovery.json
+        python benchmarks/discovery.py --baseline discovery.json
+
+The importer is a stub without a dcc, the scan cache is disabled so every run lists
+and classifies the folder. Needs PySide2 for the settings, mayapy works as well.
+"""
+
+import os
+import sys
+import argparse
+
+import benchmark_utils
+
+from textureimporter import importer  # noqa: E402
+
+
+METRICS = ('get_materials', 'get_networks', 'get_networks_many')
+
+
+class NullScanCache(object):
+    def load(self, index):
+        return {}
+
+    def save(self, index, classifications):
+        pass
+
+
+class BenchmarkImporter(importer.Importer):
+    # discovery only, nothing exists in the scene and nothing is cached
+    display_name = 'Benchmark'
+    plugin_name = 'benchmark'
+    settings_group = 'benchmark'
+
+    def __init__(self):
+        super(BenchmarkImporter, self).__init__()
+        self.scan_cache = NullScanCache()
+
+    def exists_many(self, node_names):
+        return set()
+
+
+def load_config(name):
+    return importer.Config.from_json(os.path.join(benchmark_utils.CONFIGS_PATH, '{}.json'.format(name)))
+
+
+def benchmark(size, config, repeat=3, udims=10, materials_per_folder=0, workers=4):
+    file_names = benchmark_utils.generate_file_names(
+        size, udims=udims, materials_per_folder=materials_per_folder)
+    include_subfolders = bool(materials_per_folder)
+
+    with benchmark_utils.texture_tree(file_names) as path:
+        texture_importer = BenchmarkImporter()
+
+        def get_materials():
+            texture_importer.prepare(path, config, include_subfolders)
+            return texture_importer.get_materials()
+
+        def get_networks():
+            return texture_importer.get_networks(path, config, include_subfolders)
+
+        # the same folder searched as separate paths
+        paths = [path] * workers
+
+        def get_networks_many():
+            return texture_importer.get_networks_many(
+                paths, config, include_subfolders, max_workers=workers)
+
+        get_materials_time, materials = benchmark_utils.timeit(get_materials, repeat)
+        get_networks_time, networks = benchmark_utils.timeit(get_networks, repeat)
+        get_networks_many_time, _ = benchmark_utils.timeit(get_networks_many, repeat)
+
+    result = {
+        'files': size,
+        'materials': len(materials),
+        'networks': len(networks),
+        'subfolders': include_subfolders,
+        'get_materials': get_materials_time,
+        'get_networks': get_networks_time,
+        'get_networks_many': get_networks_many_time,
+    }
+    return result
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--config', default='Arnold', help='name of a config in textureimporter/configs')
+    parser.add_argument('--udims', type=int, default=10, help='udim tiles per channel, 0 for none')
+    parser.add_argument(
+        '--materials-per-folder', type=int, default=0, help='moves materials into subfolders')
+    parser.add_argument('--workers', type=int, default=4, help='paths searched by get_networks_many')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='write the json results to this path')
+    parser.add_argument('--baseline', help='compare with the json results of a previous run')
+    parser.add_argument('--threshold', type=float, default=1.2, help='slowdown factor that fails')
+    args = parser.parse_args(args)
+
+    config = load_config(args.config)
+    results = []
+    for size in args.sizes:
+        results.append(benchmark(
+            size, config,
+            repeat=args.repeat,
+            udims=args.udims,
+            materials_per_folder=args.materials_per_folder,
+            workers=args.workers))
+
+    benchmark_utils.write_results('discovery', results, args.output)
+
+    if args.baseline:
+        regressions = benchmark_utils.compare_results(
+            results, args.baseline, 'files', METRICS, args.threshold)
+        return benchmark_utils.report_regressions(regressions)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
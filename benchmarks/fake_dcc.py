@@ -0,0 +1,524 @@
+"""In-memory stand-ins for maya.cmds, maya.mel and pymxs.runtime.
+
+Only the subset of commands used by the plugins is implemented. Nodes, attributes
+and connections are tracked and every call is counted, so the number of dcc round
+trips per network can be measured outside of the dcc.
+
+    dcc = fake_dcc.install()
+    from textureimporter.plugins import maya_arnold
+"""
+
+import re
+import sys
+import types
+import tempfile
+import functools
+import collections
+
+
+# attributes that getAttr reports as float, file nodes are connected with outAlpha
+FLOAT_ATTRIBUTES = {
+    'metalness', 'specularRoughness', 'diffuseRoughness', 'coatRoughness', 'sheenRoughness',
+    'reflectionGlossiness', 'refractionGlossiness', 'refl_roughness', 'refl_metalness',
+    'refr_roughness', 'coat_roughness', 'bumpValue',
+}
+
+MAX_MATERIAL_CLASSES = {'physicalmaterial', 'ai_standard_surface', 'vraymtl', 'standardmaterial'}
+MAX_GEOMETRY_CLASSES = {'editable_poly', 'editable_mesh'}
+MAX_SUPERCLASSES = {'material', 'geometryclass', 'texturemap', 'rendererclass', 'arrayparameter'}
+
+CONNECT_ATTR_REGEX = re.compile(r'connectAttr(?:\s+-f)?\s+"([^"]+)"\s+"([^"]+)";')
+
+
+def command(func):
+    # counts every call of a dcc command
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        self.calls['{}.{}'.format(self.prefix, func.__name__)] += 1
+        return func(self, *args, **kwargs)
+    return wrapper
+
+
+def as_list(value):
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple, set)):
+        return list(value)
+    return [value]
+
+
+class FakeCmds(object):
+    prefix = 'cmds'
+
+    def __init__(self, calls):
+        self.calls = calls
+        self.reset()
+
+    def reset(self):
+        self.nodes = collections.OrderedDict()
+        # destination plug: source plug
+        self.connections = collections.OrderedDict()
+        self.set_members = {}
+        self.selection = []
+        self.undo_chunks = 0
+
+    def create_meshes(self, count):
+        meshes = [self.add_node('transform', 'mesh{}'.format(i + 1)) for i in range(count)]
+        self.selection = list(meshes)
+        return meshes
+
+    def add_node(self, node_type, name=None):
+        name = self.unique_name(name or '{}1'.format(node_type))
+        self.nodes[name] = {'type': node_type, 'attributes': {}}
+        if node_type == 'shadingEngine':
+            self.set_members[name] = []
+        return name
+
+    def unique_name(self, name):
+        if name not in self.nodes:
+            return name
+        base = name.rstrip('0123456789')
+        i = 1
+        while '{}{}'.format(base, i) in self.nodes:
+            i += 1
+        return '{}{}'.format(base, i)
+
+    def split_plug(self, plug):
+        node, _, attribute = plug.partition('.')
+        if node not in self.nodes:
+            raise RuntimeError('No object matches name: {}'.format(plug))
+        return node, attribute
+
+    def connect(self, source, destination, force=False):
+        self.split_plug(source)
+        self.split_plug(destination)
+        if destination in self.connections and not force:
+            raise RuntimeError('{} already has an incoming connection'.format(destination))
+        self.connections[destination] = source
+
+    @command
+    def about(self, **kwargs):
+        return True
+
+    @command
+    def pluginInfo(self, name, query=False, loaded=False):
+        return True
+
+    @command
+    def loadPlugin(self, name):
+        pass
+
+    @command
+    def undoInfo(self, openChunk=False, closeChunk=False, chunkName=''):
+        if openChunk:
+            self.undo_chunks += 1
+
+    @command
+    def ls(self, *names, **kwargs):
+        if kwargs.get('selection'):
+            return list(self.selection)
+        nodes = []
+        for name in names:
+            nodes.extend(node for node in as_list(name) if node in self.nodes)
+        return nodes
+
+    @command
+    def select(self, *nodes, **kwargs):
+        if kwargs.get('clear'):
+            self.selection = []
+            return
+        selection = []
+        for node in nodes:
+            selection.extend(as_list(node))
+        self.selection = selection
+
+    @command
+    def objExists(self, name):
+        return name.partition('.')[0] in self.nodes
+
+    @command
+    def nodeType(self, node):
+        return self.nodes[node]['type']
+
+    @command
+    def shadingNode(self, node_type, name=None, skipSelect=False, **kwargs):
+        node = self.add_node(node_type, name)
+        if not skipSelect:
+            self.selection = [node]
+        return node
+
+    @command
+    def sets(self, *members, **kwargs):
+        if kwargs.get('query'):
+            return list(self.set_members.get(members[0], []))
+        if kwargs.get('edit'):
+            shadingengine_node = kwargs.get('forceElement')
+            for node in members:
+                for member in as_list(node):
+                    for members_ in self.set_members.values():
+                        if member in members_:
+                            members_.remove(member)
+                    self.set_members[shadingengine_node].append(member)
+            return
+        return self.add_node('shadingEngine', kwargs.get('name'))
+
+    @command
+    def rename(self, node, name):
+        new_name = self.unique_name(name)
+        self.nodes[new_name] = self.nodes.pop(node)
+        if node in self.set_members:
+            self.set_members[new_name] = self.set_members.pop(node)
+
+        connections = collections.OrderedDict()
+        for destination, source in self.connections.items():
+            destination = self.rename_plug(destination, node, new_name)
+            connections[destination] = self.rename_plug(source, node, new_name)
+        self.connections = connections
+        return new_name
+
+    def rename_plug(self, plug, node, new_name):
+        plug_node, _, attribute = plug.partition('.')
+        if plug_node != node:
+            return plug
+        return '{}.{}'.format(new_name, attribute)
+
+    @command
+    def delete(self, *nodes):
+        for node in nodes:
+            for name in as_list(node):
+                self.nodes.pop(name, None)
+                self.set_members.pop(name, None)
+                for destination, source in list(self.connections.items()):
+                    if name in (destination.partition('.')[0], source.partition('.')[0]):
+                        del self.connections[destination]
+
+    @command
+    def connectAttr(self, source, destination, force=False):
+        self.connect(source, destination, force)
+
+    @command
+    def isConnected(self, source, destination):
+        return self.connections.get(destination) == source
+
+    @command
+    def setAttr(self, plug, *values, **kwargs):
+        node, attribute = self.split_plug(plug)
+        self.nodes[node]['attributes'][attribute] = values[0] if len(values) == 1 else values
+
+    @command
+    def getAttr(self, plug, type=False):
+        node, attribute = self.split_plug(plug)
+        if type:
+            return 'float' if attribute in FLOAT_ATTRIBUTES else 'float3'
+        return self.nodes[node]['attributes'].get(attribute, 0)
+
+    @command
+    def listAttr(self, node, **kwargs):
+        return list(self.nodes[node]['attributes'])
+
+    @command
+    def listConnections(
+            self, plug, destination=True, source=True, type=None, connections=False, plugs=False):
+        node, _, attribute = plug.partition('.')
+        results = []
+        for destination_plug, source_plug in self.connections.items():
+            for own_plug, other_plug, enabled in (
+                    (source_plug, destination_plug, destination),
+                    (destination_plug, source_plug, source)):
+                own_node, _, own_attribute = own_plug.partition('.')
+                if not enabled or own_node != node or (attribute and own_attribute != attribute):
+                    continue
+                other_node = other_plug.partition('.')[0]
+                if type and self.nodes[other_node]['type'] != type:
+                    continue
+                if connections:
+                    results.append(own_plug)
+                results.append(other_plug if plugs else other_node)
+        return results or None
+
+    @command
+    def file(self, *args, **kwargs):
+        pass
+
+
+class FakeMel(object):
+    prefix = 'mel'
+
+    def __init__(self, calls, cmds):
+        self.calls = calls
+        self.cmds = cmds
+
+    @command
+    def eval(self, script):
+        # only connectAttr is interpreted, it is what the plugins batch through mel
+        for source, destination in CONNECT_ATTR_REGEX.findall(script):
+            self.cmds.connect(source, destination, force=True)
+        return ''
+
+
+class FakeClass(object):
+    def __init__(self, runtime, name, superclass=None):
+        self.runtime = runtime
+        self.name = name
+        self.superclass = superclass
+
+    def __call__(self, **kwargs):
+        self.runtime.calls['rt.{}'.format(self.name)] += 1
+        return self.runtime.add_node(self, **kwargs)
+
+    def __eq__(self, other):
+        return isinstance(other, FakeClass) and self.name.lower() == other.name.lower()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.name.lower())
+
+    def __str__(self):
+        return self.name
+
+
+class FakeNode(object):
+    # every property write is a round trip to maxscript
+    def __init__(self, runtime, cls, **properties):
+        object.__setattr__(self, '_runtime', runtime)
+        object.__setattr__(self, '_class', cls)
+        object.__setattr__(self, '_properties', collections.OrderedDict())
+        object.__setattr__(self, 'name', properties.pop('name', ''))
+        object.__setattr__(self, 'material', properties.pop('material', None))
+        self._properties.update(properties)
+
+    def __setattr__(self, name, value):
+        self._runtime.calls['rt.setattr'] += 1
+        if name in ('name', 'material'):
+            object.__setattr__(self, name, value)
+        else:
+            self._properties[name] = value
+        if name == 'material':
+            self._runtime.callbacks.notify('mtlRefAdded')
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        self._runtime.calls['rt.getattr'] += 1
+        return self._properties.get(name)
+
+    @property
+    def Name(self):
+        return self.name
+
+
+class FakeDependents(object):
+    def __init__(self, runtime):
+        self.runtime = runtime
+
+    def dependents(self, node):
+        self.runtime.calls['rt.refs.dependents'] += 1
+        dependents = []
+        for other in self.runtime.nodes:
+            if other.material is node or any(value is node for value in other._properties.values()):
+                dependents.append(other)
+        return dependents
+
+
+class FakeCallbacks(object):
+    # general event callbacks, scripts of an event are called when the fake scene changes
+    def __init__(self, runtime):
+        self.runtime = runtime
+        self.scripts = collections.OrderedDict()
+
+    def addScript(self, event, script, id=None):
+        self.runtime.calls['rt.callbacks.addScript'] += 1
+        self.scripts.setdefault(event, []).append((id, script))
+
+    def removeScripts(self, event=None, id=None):
+        self.runtime.calls['rt.callbacks.removeScripts'] += 1
+        for key, scripts in self.scripts.items():
+            if event is None or key == event:
+                self.scripts[key] = [item for item in scripts if id is not None and item[0] != id]
+
+    def notify(self, event):
+        for callback_id, script in self.scripts.get(event, []):
+            script()
+
+
+class FakeMeditMaterials(object):
+    def __init__(self, runtime):
+        self.runtime = runtime
+        self.slots = {}
+
+    def __setitem__(self, index, material):
+        self.runtime.calls['rt.meditmaterials'] += 1
+        self.slots[index] = material
+
+    def __getitem__(self, index):
+        return self.slots.get(index)
+
+
+class FakeRuntime(object):
+    def __init__(self, calls):
+        self.calls = calls
+        self.classes = {}
+
+        self.Material = self.get_class('Material')
+        self.GeometryClass = self.get_class('GeometryClass')
+        self.textureMap = self.get_class('textureMap')
+        self.RendererClass = self.get_class('RendererClass')
+        self.ArrayParameter = self.get_class('ArrayParameter')
+        self.rendererClass = FakeClass(self, 'rendererClass')
+        self.rendererClass.classes = ['Arnold', 'V_Ray', 'Scanline']
+        self.refs = FakeDependents(self)
+        self.callbacks = FakeCallbacks(self)
+        self.reset()
+
+    def reset(self):
+        self.nodes = []
+        self.saved_materials = []
+        self.meditmaterials = FakeMeditMaterials(self)
+        self._selection = []
+        self.callbacks.notify('systemPostReset')
+
+    def __getattr__(self, name):
+        # any other name is a node class such as rt.PhysicalMaterial or rt.ai_image
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self.get_class(name)
+
+    def get_class(self, name):
+        key = name.lower()
+        if key not in self.classes:
+            if key in MAX_SUPERCLASSES:
+                superclass = None
+            elif key in MAX_MATERIAL_CLASSES:
+                superclass = self.Material
+            elif key in MAX_GEOMETRY_CLASSES:
+                superclass = self.GeometryClass
+            else:
+                superclass = self.textureMap
+            self.classes[key] = FakeClass(self, name, superclass)
+        return self.classes[key]
+
+    def add_node(self, cls, **properties):
+        node = FakeNode(self, cls, **properties)
+        self.nodes.append(node)
+        if cls.superclass == self.GeometryClass:
+            self.callbacks.notify('nodeCreated')
+        return node
+
+    def create_meshes(self, count):
+        cls = self.get_class('Editable_Poly')
+        meshes = [self.add_node(cls, name='mesh{}'.format(i + 1)) for i in range(count)]
+        self._selection = list(meshes)
+        return meshes
+
+    @property
+    def selection(self):
+        self.calls['rt.selection'] += 1
+        return list(self._selection)
+
+    @property
+    def objects(self):
+        self.calls['rt.objects'] += 1
+        return [node for node in self.nodes if node._class.superclass == self.GeometryClass]
+
+    @property
+    def sceneMaterials(self):
+        # like in 3ds max the list is only updated when the scene is saved
+        self.calls['rt.sceneMaterials'] += 1
+        return list(self.saved_materials)
+
+    def select(self, nodes):
+        self.calls['rt.select'] += 1
+        self._selection = as_list(nodes)
+
+    def classOf(self, node):
+        self.calls['rt.classOf'] += 1
+        return node._class if isinstance(node, FakeNode) else None
+
+    def superClassOf(self, node):
+        self.calls['rt.superClassOf'] += 1
+        return node._class.superclass if isinstance(node, FakeNode) else None
+
+    def getPropNames(self, node):
+        self.calls['rt.getPropNames'] += 1
+        return list(node._properties)
+
+    def getProperty(self, node, name):
+        self.calls['rt.getProperty'] += 1
+        return node._properties.get(name)
+
+    def setProperty(self, node, name, value):
+        self.calls['rt.setProperty'] += 1
+        node._properties[name] = value
+
+    def Color(self, *values):
+        return tuple(values)
+
+    def Name(self, name):
+        return name
+
+    def saveMaxFile(self, path, quiet=False):
+        self.calls['rt.saveMaxFile'] += 1
+        self.update_scene_materials()
+
+    def saveNodes(self, nodes, path, quiet=False):
+        self.calls['rt.saveNodes'] += 1
+        self.update_scene_materials()
+
+    def deleteFile(self, path):
+        self.calls['rt.deleteFile'] += 1
+        return True
+
+    def GetDir(self, name):
+        return tempfile.gettempdir()
+
+    def UpdateSceneMaterialLib(self):
+        self.calls['rt.UpdateSceneMaterialLib'] += 1
+        self.update_scene_materials()
+
+    def update_scene_materials(self):
+        self.saved_materials = [
+            node for node in self.nodes if node._class.superclass == self.Material]
+
+
+class FakeDcc(object):
+    def __init__(self):
+        self.calls = collections.Counter()
+        self.cmds = FakeCmds(self.calls)
+        self.mel = FakeMel(self.calls, self.cmds)
+        self.runtime = FakeRuntime(self.calls)
+
+    def reset(self):
+        self.calls.clear()
+        self.cmds.reset()
+        self.runtime.reset()
+
+    def create_meshes(self, count):
+        self.cmds.create_meshes(count)
+        self.runtime.create_meshes(count)
+
+
+def install():
+    """Registers the fake modules, this has to happen before the plugins are imported."""
+
+    dcc = FakeDcc()
+
+    maya = types.ModuleType('maya')
+    standalone = types.ModuleType('maya.standalone')
+    standalone.initialize = lambda *args, **kwargs: None
+    maya.cmds = dcc.cmds
+    maya.mel = dcc.mel
+    maya.standalone = standalone
+
+    pymxs = types.ModuleType('pymxs')
+    pymxs.runtime = dcc.runtime
+
+    sys.modules.update({
+        'maya': maya,
+        'maya.cmds': dcc.cmds,
+        'maya.mel': dcc.mel,
+        'maya.standalone': standalone,
+        'pymxs': pymxs,
+    })
+    return dcc
@@ -0,0 +1,87 @@
+"""Compares refreshing the 3ds Max scene materials with a temp save and with the scene callbacks.
+
+Usage:  python.ExecuteFile @"<path>\\benchmarks\\max_materials.py" in 3ds Max with a scene open
+        python benchmarks/max_materials.py --fake --materials 1000
+
+save_nodes is the previous refresh that saved an empty temp file on every search,
+changed rebuilds the snapshot with UpdateSceneMaterialLib after a scene event and
+unchanged is a search without a scene event, which reuses the snapshot. With --fake
+the in-memory stand-in from fake_dcc is used, so only the calls per refresh are meaningful.
+"""
+
+import os
+import sys
+import argparse
+import importlib
+
+# python.ExecuteFile does not add the folder of the script
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import benchmark_utils  # noqa: E402
+import fake_dcc  # noqa: E402
+
+
+def save_nodes(rt):
+    # the refresh that ran before every search until the scene callbacks were used
+    temp_path = os.path.join(rt.GetDir(rt.Name('temp')), 'textureimporter.max')
+    rt.saveNodes([], temp_path, quiet=True)
+    rt.deleteFile(temp_path)
+    return dict((material.name, material) for material in rt.sceneMaterials)
+
+
+def benchmark(max_plugin, rt, calls=None, repeat=3):
+    texture_importer = max_plugin.Importer()
+
+    def changed():
+        max_plugin.scene_changed()
+        return texture_importer.scene_materials()
+
+    methods = [
+        ('save_nodes', lambda: save_nodes(rt)),
+        ('changed', changed),
+        ('unchanged', texture_importer.scene_materials),
+    ]
+
+    results = []
+    for name, func in methods:
+        # the snapshot is built once, so unchanged only measures the lookup
+        texture_importer.scene_materials()
+        if calls is not None:
+            calls.clear()
+        method_time, materials = benchmark_utils.timeit(func, repeat)
+        result = {
+            'method': name,
+            'materials': len(materials),
+            'time': method_time,
+        }
+        if calls is not None:
+            result['calls'] = float(sum(calls.values())) / repeat
+        results.append(result)
+    return results
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--fake', action='store_true', help='use the in-memory stand-in of pymxs')
+    parser.add_argument('--materials', type=int, default=1000, help='number of fake materials')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='write the json results to this path')
+    args = parser.parse_args(args)
+
+    calls = None
+    if args.fake:
+        dcc = fake_dcc.install()
+        dcc.create_meshes(args.materials)
+        for mesh in dcc.runtime.nodes[:]:
+            mesh.material = dcc.runtime.PhysicalMaterial(name='{}_mat'.format(mesh.name))
+        calls = dcc.calls
+
+    import pymxs
+    max_plugin = importlib.import_module('textureimporter.plugins.max')
+    results = benchmark(max_plugin, pymxs.runtime, calls, args.repeat)
+    benchmark_utils.write_results('max_materials', results, args.output)
+    return 0
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,406 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+try:
+    # the plugins import the dialog
+    import PySide2
+except ImportError:
+    PySide2 = None
+
+from textureimporter import pattern_utils
+from textureimporter import scan_utils
+from textureimporter import timing_utils
+
+BENCHMARKS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks')
+
+
+def create_files(root, file_names):
+    for file_name in file_names:
+        path = os.path.join(root, file_name)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        open(path, 'w').close()
+
+
+class DirectoryIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp(prefix='textureimporter')
+        create_files(self.path, [
+            'Chrome_BaseColor.1001.png',
+            'Chrome_BaseColor.1002.png',
+            'Chrome_Roughness.png',
+            '.hidden_BaseColor.png',
+            os.path.join('sub', 'Rubber_BaseColor.png'),
+        ])
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_refresh_directory(self):
+        index = scan_utils.DirectoryIndex(self.path, recursive=True)
+        index.load()
+        create_files(self.path, [
+            'Chrome_Normal.png',
+            os.path.join('new', 'Glass_BaseColor.png'),
+        ])
+        os.remove(os.path.join(self.path, 'Chrome_Roughness.png'))
+
+        added, removed = index.refresh_directory('')
+        self.assertEqual(added, ['Chrome_Normal.png', os.path.join('new', 'Glass_BaseColor.png')])
+        self.assertEqual(removed, ['Chrome_Roughness.png'])
+        self.assertIn('new', index.directories)
+        self.assertEqual(len(index), 6)
+
+        shutil.rmtree(os.path.join(self.path, 'sub'))
+        added, removed = index.refresh_directory('')
+        self.assertEqual(removed, [os.path.join('sub', 'Rubber_BaseColor.png')])
+        self.assertNotIn('sub', index.directories)
+
+    def test_hidden_files(self):
+        # hidden files are listed, patterns only match them when they start with a dot
+        index = scan_utils.DirectoryIndex(self.path)
+        self.assertEqual(len(index), 4)
+        classification = pattern_utils.Classification(['$material_BaseColor.png', '.hidden_*.png'])
+        classification.extend(index)
+        self.assertEqual(classification.materials, [])
+        self.assertEqual(classification.best_match(None, 1).file_name, '.hidden_BaseColor.png')
+
+
+class WalkTestCase(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp(prefix='textureimporter')
+        create_files(self.path, [
+            'Chrome_BaseColor.png',
+            os.path.join('lod0', 'Rubber_BaseColor.png'),
+            os.path.join('lod0', 'high', 'Glass_BaseColor.png'),
+            os.path.join('_old', 'Chrome_BaseColor.png'),
+            os.path.join('.mayaSwatches', 'Chrome_BaseColor.png'),
+        ])
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_walk(self):
+        files = list(scan_utils.walk(self.path, ignore_patterns=['_old']))
+        self.assertEqual(files, [
+            'Chrome_BaseColor.png',
+            os.path.join('lod0', 'Rubber_BaseColor.png'),
+            os.path.join('lod0', 'high', 'Glass_BaseColor.png'),
+        ])
+
+    def test_walk_max_depth(self):
+        files = list(scan_utils.walk(self.path, max_depth=1, ignore_patterns=['_old']))
+        self.assertEqual(len(files), 2)
+        files = list(scan_utils.walk(self.path, recursive=False))
+        self.assertEqual(files, ['Chrome_BaseColor.png'])
+
+    def test_classify_subfolders(self):
+        index = scan_utils.DirectoryIndex(self.path, recursive=True, ignore_patterns=['_old'])
+        classification = pattern_utils.Classification(['$material_BaseColor.png'])
+        classification.extend(index)
+        glass = os.path.join('lod0', 'high', 'Glass')
+        self.assertEqual(classification.materials, ['Chrome', os.path.join('lod0', 'Rubber'), glass])
+        self.assertEqual(classification.material_name(glass), 'Glass')
+        match = classification.best_match(glass, 0)
+        self.assertEqual(match.udim_path, os.path.join('lod0', 'high', 'Glass_BaseColor.png'))
+
+    def test_material_name(self):
+        classification = pattern_utils.Classification(['$material_BaseColor.png'])
+        classification.extend(['Chrome-Metal_BaseColor.png'])
+        self.assertEqual(classification.materials, ['Chrome-Metal'])
+        self.assertEqual(classification.material_name('Chrome-Metal'), 'Chrome_Metal')
+
+    def test_classify_same_materials(self):
+        classification = pattern_utils.Classification(['$material_BaseColor.png', '$material_Roughness.png'])
+        classification.extend([
+            os.path.join('assetA', 'lod0', 'Body_BaseColor.png'),
+            os.path.join('assetB', 'lod0', 'Body_BaseColor.png'),
+            os.path.join('assetB', 'lod0', 'Body_Roughness.png'),
+        ])
+        body_a = os.path.join('assetA', 'lod0', 'Body')
+        body_b = os.path.join('assetB', 'lod0', 'Body')
+        self.assertEqual(classification.materials, [body_a, body_b])
+        self.assertEqual(classification.material_name(body_a), 'assetA_lod0_Body')
+        self.assertIsNone(classification.best_match(body_a, 1))
+        self.assertEqual(classification.best_match(body_b, 1).directory, os.path.join('assetB', 'lod0'))
+
+
+class ScanCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp(prefix='textureimporter')
+        self.cache_path = tempfile.mkdtemp(prefix='textureimporter')
+        create_files(self.path, [
+            'Chrome_BaseColor.png',
+            os.path.join('lod0', 'Rubber_BaseColor.png'),
+        ])
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+        shutil.rmtree(self.cache_path)
+
+    def test_cache(self):
+        cache = scan_utils.ScanCache(self.cache_path)
+
+        index = scan_utils.DirectoryIndex(self.path, recursive=True)
+        self.assertEqual(cache.load(index), {})
+        classification = pattern_utils.Classification(['$material_BaseColor.png'])
+        classification.extend(index)
+        cache.save(index, {classification.key: classification.to_dict()})
+
+        index = scan_utils.DirectoryIndex(self.path, recursive=True)
+        classifications = cache.load(index)
+        self.assertTrue(index.complete)
+        self.assertEqual(len(index), 2)
+        cached_classification = pattern_utils.Classification.from_dict(classifications[classification.key])
+        rubber = os.path.join('lod0', 'Rubber')
+        self.assertEqual(cached_classification.materials, ['Chrome', rubber])
+        self.assertEqual(
+            cached_classification.best_match(rubber, 0).udim_path,
+            os.path.join('lod0', 'Rubber_BaseColor.png'))
+
+        # a different listing does not use the cache
+        index = scan_utils.DirectoryIndex(self.path, recursive=False)
+        self.assertEqual(cache.load(index), {})
+
+    def test_cache_invalidation(self):
+        cache = scan_utils.ScanCache(self.cache_path)
+        index = scan_utils.DirectoryIndex(self.path, recursive=True)
+        index.load()
+        cache.save(index, {})
+
+        directories = index.directories
+        directories['lod0'] = [0, 0]
+        index = scan_utils.DirectoryIndex(self.path, recursive=True)
+        index.restore([], directories)
+        cache.save(index, {})
+
+        index = scan_utils.DirectoryIndex(self.path, recursive=True)
+        cache.load(index)
+        self.assertFalse(index.complete)
+
+    def test_cache_limits(self):
+        cache = scan_utils.ScanCache(self.cache_path)
+        cache.max_classifications = 1
+        cache.max_files = 1
+
+        index = scan_utils.DirectoryIndex(self.path, recursive=True)
+        index.load()
+        cache.save(index, {'a': {}})
+        cache.save(index, {'b': {}})
+        self.assertEqual(list(cache.load(index)), ['b'])
+
+        # the least recently used entry is removed
+        other_index = scan_utils.DirectoryIndex(self.path, recursive=False)
+        other_index.load()
+        cache.save(other_index, {})
+        self.assertEqual(os.listdir(self.cache_path), [os.path.basename(cache.file_path(other_index))])
+
+
+class CompiledPatternTestCase(unittest.TestCase):
+    def test_match_tokens(self):
+        pattern = pattern_utils.compile_pattern('$material_BaseColor(.$udim).*')
+        match = pattern.match('Chrome-Metal_BaseColor.1001.png')
+        self.assertEqual(match.material, 'Chrome-Metal')
+        self.assertEqual(match.udim, '1001')
+        self.assertEqual(match.rank, (0, ))
+        self.assertEqual(match.udim_file_name, 'Chrome-Metal_BaseColor.<UDIM>.png')
+
+        match = pattern.match('Chrome_BaseColor.png')
+        self.assertEqual(match.material, 'Chrome')
+        self.assertIsNone(match.udim)
+        self.assertEqual(match.rank, (1, ))
+
+        self.assertIsNone(pattern.match('Chrome_Roughness.png'))
+        self.assertIsNone(pattern.match('.Chrome_BaseColor.png'))
+        # names that would not be valid node names
+        self.assertIsNone(pattern.match('My Mat_BaseColor.png'))
+        self.assertIsNone(pattern.match('Chrome.v2_BaseColor.png'))
+
+    def test_match_options_rank(self):
+        pattern = pattern_utils.compile_pattern('$material_BaseColor.(tx|jpg|*)')
+        self.assertEqual(pattern.match('Chrome_BaseColor.tx').rank, (0, ))
+        self.assertEqual(pattern.match('Chrome_BaseColor.jpg').rank, (1, ))
+        self.assertEqual(pattern.match('Chrome_BaseColor.png').rank, (2, ))
+
+    def test_match_literal_names(self):
+        pattern = pattern_utils.compile_pattern('$mesh_$material_[A-Z]*.png', mesh='helmet_visor')
+        match = pattern.match('helmet_visor_glass_Normal.png')
+        self.assertEqual(match.mesh, 'helmet_visor')
+        self.assertEqual(match.material, 'glass')
+        self.assertIsNone(pattern.match('helmet_glass_Normal.png'))
+
+        pattern = pattern_utils.compile_pattern('$material.png', material='a+b')
+        self.assertTrue(pattern.match('a+b.png'))
+        self.assertIsNone(pattern.match('aab.png'))
+
+    def test_compiled_once(self):
+        pattern = pattern_utils.compile_pattern('$material_Normal.png', 'helmet')
+        self.assertIs(pattern_utils.compile_pattern('$material_Normal.png', 'helmet'), pattern)
+        self.assertEqual(
+            pattern_utils.pattern_tokens(('$mesh_$material_Normal.png', 'Noise.png')),
+            {'mesh', 'material'})
+
+
+class LRUCacheTestCase(unittest.TestCase):
+    def test_lru_cache(self):
+        cache = pattern_utils.LRUCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(len(cache), 2)
+
+
+class ClassificationTestCase(unittest.TestCase):
+    def test_classify(self):
+        classification = pattern_utils.Classification([
+            '$material_BaseColor(.$udim).*',
+            '$material_Roughness.(tx|*)',
+            'Noise.png',
+        ])
+        classification.extend([
+            'Chrome_BaseColor.1002.png',
+            'Chrome_BaseColor.1001.png',
+            'Chrome_Roughness.png',
+            'Chrome_Roughness.tx',
+            'Rubber_BaseColor.png',
+            'Noise.png',
+            'Glass_Roughness.png',
+        ])
+
+        self.assertEqual(classification.materials, ['Chrome', 'Rubber'])
+
+        match = classification.best_match('Chrome', 0)
+        self.assertEqual(match.udim_file_name, 'Chrome_BaseColor.<UDIM>.png')
+        self.assertEqual(classification.udims('Chrome', 0), ['1001', '1002'])
+        self.assertEqual(classification.best_match('Chrome', 1).file_name, 'Chrome_Roughness.tx')
+        self.assertIsNone(classification.best_match('Rubber', 1))
+        self.assertEqual(classification.best_match('Rubber', 2).file_name, 'Noise.png')
+
+    def test_update(self):
+        classification = pattern_utils.Classification(['$material_BaseColor(.$udim).*', 'Noise.png'])
+        classification.extend(['Chrome_BaseColor.1001.png', 'Rubber_BaseColor.png'])
+
+        materials = classification.update(
+            added=['Chrome_BaseColor.1002.png', 'Glass_BaseColor.png'],
+            removed=['Rubber_BaseColor.png'])
+        self.assertEqual(materials, {'Chrome', 'Glass', 'Rubber'})
+        self.assertEqual(classification.materials, ['Chrome', 'Glass'])
+        self.assertEqual(classification.udims('Chrome', 0), ['1001', '1002'])
+        self.assertEqual(classification.update(added=['Noise.png']), {None})
+
+    def test_classify_parallel(self):
+        patterns = ['$material_BaseColor(.$udim).*', '$material_Roughness.(tx|*)']
+        file_paths = [
+            'Chrome_Roughness.png',
+            'Chrome_BaseColor.1001.png',
+            'Rubber_BaseColor.png',
+            'Chrome_Roughness.tx',
+            'Glass_BaseColor.png',
+            'Chrome_BaseColor.1002.png',
+        ]
+        classification = pattern_utils.Classification(patterns)
+        classification.extend(file_paths)
+        parallel_classification = pattern_utils.classify_parallel(
+            patterns, file_paths, processes=3, min_shard_size=1)
+        self.assertEqual(parallel_classification.to_dict(), classification.to_dict())
+
+
+class TimingsTestCase(unittest.TestCase):
+    def test_timings(self):
+        timings = timing_utils.Timings('refresh')
+        for i in range(3):
+            with timings.span('get_network'):
+                pass
+        timings.add_span('get_materials', 2.0)
+        timings.count('files_scanned', 10)
+        timings.count('files_scanned', 5)
+
+        data = timings.to_dict()
+        self.assertEqual(data['spans']['get_network']['count'], 3)
+        self.assertEqual(data['counters'], {'files_scanned': 15})
+        self.assertTrue(timings.summary().startswith('get_materials 2.00s, get_network'))
+
+    def test_call_counter(self):
+        module = type('Module', (object, ), {'about': staticmethod(lambda: 'maya')})
+        cmds = timing_utils.CallCounter(module)
+        self.assertEqual(cmds.about(), 'maya')
+        cmds.timings = timing_utils.Timings('import')
+        cmds.about()
+        cmds.about()
+        self.assertEqual(cmds.timings.counters, {'dcc_calls': 2})
+
+    def test_write_log(self):
+        path = tempfile.mkdtemp(prefix='textureimporter')
+        try:
+            log_path = os.path.join(path, 'timings.log')
+            timing_utils.write_log(timing_utils.Timings('refresh'), log_path)
+            timing_utils.write_log(timing_utils.Timings('import'), log_path, max_size=0)
+            with open(log_path) as f:
+                self.assertIn('"import"', f.read())
+            self.assertTrue(os.path.isfile(log_path + '.1'))
+        finally:
+            shutil.rmtree(path)
+
+
+@unittest.skipIf(PySide2 is None, 'PySide2 is not installed')
+class MayaCreationTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # maya.cmds is replaced with the in-memory stand-in of the benchmarks
+        sys.path.insert(0, BENCHMARKS_PATH)
+        import creation
+        from textureimporter import importer
+        cls.dcc = creation.dcc
+        cls.importer = importer
+
+    @classmethod
+    def tearDownClass(cls):
+        sys.path.remove(BENCHMARKS_PATH)
+
+    def create_networks(self, texture_importer, config, material_names):
+        networks = []
+        for material_name in material_names:
+            network = self.importer.Network()
+            network.material = material_name
+            network.material_name = material_name
+            network.material_node_name = texture_importer.resolve_name('material_node_pattern', material_name)
+            for channel in config.channels:
+                network_channel = self.importer.NetworkChannel(network)
+                network_channel.attribute_name = channel.attribute
+                network_channel.file_node_name = texture_importer.resolve_name(
+                    'file_node_pattern', '{}_{}'.format(material_name, channel.attribute))
+                network_channel.file_path = '{}_{}.png'.format(material_name, channel.attribute)
+            networks.append(network)
+        return networks
+
+    def test_shared_place_node(self):
+        import creation
+        texture_importer = self.importer.Importer.from_plugin('maya_arnold')
+        settings_bool = texture_importer.settings.bool
+        texture_importer.settings.bool = lambda key: key.endswith('share_place_node') or settings_bool(key)
+        config = creation.load_config('maya_arnold', texture_importer)
+
+        self.dcc.reset()
+        texture_importer.create_networks(
+            self.create_networks(texture_importer, config, ['Chrome']), on_conflict='remove')
+        texture_importer.create_networks(
+            self.create_networks(texture_importer, config, ['Rubber']), on_conflict='remove')
+
+        cmds = self.dcc.cmds
+        place_nodes = [node for node, data in cmds.nodes.items() if data['type'] == 'place2dTexture']
+        file_nodes = [node for node, data in cmds.nodes.items() if data['type'] == 'file']
+        self.assertEqual(len(place_nodes), 1)
+        self.assertEqual(len(file_nodes), 2 * len(config.channels))
+        for file_node in file_nodes:
+            self.assertEqual(
+                cmds.connections.get('{}.uvCoord'.format(file_node)), '{}.outUV'.format(place_nodes[0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,7 @@
+import sys
+
+from textureimporter import batch
+
+
+if __name__ == '__main__':
+    sys.exit(batch.main())
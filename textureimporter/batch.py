@@ -0,0 +1,177 @@
+import os
+import sys
+import time
+import json
+import logging
+import argparse
+
+from . import importer
+from . import plugin_utils
+from . import utils
+from .utils import NoSelectionException
+
+
+def load_config(config):
+    # configs can be given as a path or as the name of a config in the configs directory
+    if not os.path.isfile(config):
+        settings = utils.Settings()
+        config = os.path.join(settings.configs_path, '{}.json'.format(config))
+        if not os.path.isfile(config):
+            return
+    return importer.Config.from_json(config)
+
+
+def network_report(network):
+    report = {
+        'material_name': network.material_name,
+        'material_node_name': network.material_node_name,
+        'exists': network.exists,
+        'channels': [{
+            'attribute_name': channel.attribute_name,
+            'file_node_name': channel.file_node_name,
+            'file_path': channel.file_path,
+            'udims': channel.udims,
+            'colorspace': channel.colorspace,
+            'exists': channel.exists,
+        } for channel in network.channels if channel.file_path]
+    }
+    return report
+
+
+def run(paths, config, dcc='maya', on_conflict='rename', assign_material=False,
+        include_subfolders=False, scene_path=None, dry_run=False, max_workers=4):
+    """Imports the textures of every path without the dialog and returns a report.
+
+    Args:   paths: the texture folders
+            config: a config path or the name of a config in the configs directory
+            dcc: the dcc plugin that is used, such as maya or max
+            on_conflict: remove, replace or rename existing nodes
+            assign_material: whether materials are assigned
+            include_subfolders: whether the folders are searched recursively
+            scene_path: the scene is saved to this path after the import
+            dry_run: only search for textures without creating networks
+            max_workers: the number of threads that search the paths concurrently
+    """
+
+    report = {
+        'config': config,
+        'dcc': dcc,
+        'paths': [],
+        'success': False,
+    }
+
+    config = load_config(config)
+    if not config or not config.renderer:
+        report['error'] = 'Could not read the config.'
+        return report
+
+    # the base importer creates nothing, a missing dcc or renderer plugin fails the run
+    module = plugin_utils.plugin_module(dcc)
+    if module is None:
+        report['error'] = 'Could not import the dcc: {}'.format(dcc)
+        return report
+    if hasattr(module, 'initialize'):
+        module.initialize()
+
+    plugin = '{}_{}'.format(dcc, config.renderer)
+    texture_importer = importer.Importer.from_plugin(plugin)
+    if type(texture_importer) is importer.Importer:
+        report['error'] = 'Could not find the plugin: {}'.format(plugin)
+        return report
+    try:
+        texture_importer.load_plugin()
+    except RuntimeError:
+        report['error'] = 'Unable to load plugin: {}'.format(texture_importer.plugin_name)
+        return report
+
+    kwargs = {
+        'on_conflict': on_conflict,
+        'assign_material': assign_material,
+    }
+
+    try:
+        results = texture_importer.get_networks_many(
+            paths, config, include_subfolders, max_workers=max_workers)
+    except NoSelectionException as e:
+        report['error'] = e.message
+        return report
+
+    # creating networks in the dcc is serialized on the main thread
+    for path, result in results.items():
+        path_report = {
+            'path': path,
+            'networks': [],
+            'search_time': result['time'],
+        }
+        report['paths'].append(path_report)
+
+        networks = result['networks']
+        if result['error']:
+            path_report['error'] = result['error']
+            continue
+
+        path_report['networks'] = [network_report(network) for network in networks]
+        if not dry_run:
+            # a failing path is reported, the other paths are still imported
+            start_time = time.time()
+            try:
+                texture_importer.create_networks(networks, **kwargs)
+            except Exception as e:
+                logging.exception('Could not create the networks of: {}'.format(path))
+                path_report['error'] = str(e)
+            path_report['create_time'] = time.time() - start_time
+
+    if scene_path and not dry_run:
+        try:
+            texture_importer.save_scene(scene_path)
+        except Exception as e:
+            logging.exception('Could not save the scene: {}'.format(scene_path))
+            report['error'] = str(e)
+        else:
+            report['scene_path'] = scene_path
+
+    report['timings'] = texture_importer.timings.to_dict()
+    report['success'] = 'error' not in report and all(
+        'error' not in path_report for path_report in report['paths'])
+    return report
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        prog='textureimporter',
+        description='Import texture files into a dcc without the dialog.')
+    parser.add_argument('paths', nargs='+', help='texture folders to import')
+    parser.add_argument('-c', '--config', required=True, help='config path or name')
+    parser.add_argument('-d', '--dcc', default='maya', help='dcc plugin, such as maya or max')
+    parser.add_argument(
+        '--on-conflict', default='rename', choices=('remove', 'replace', 'rename'),
+        help='how to handle existing nodes')
+    parser.add_argument('--assign-material', action='store_true', help='assign materials')
+    parser.add_argument('--include-subfolders', action='store_true', help='search folders recursively')
+    parser.add_argument('--scene', help='save the scene to this path after the import')
+    parser.add_argument('--report', help='write the json report to this path instead of stdout')
+    parser.add_argument('--dry-run', action='store_true', help='only search for textures')
+    parser.add_argument('--threads', type=int, default=4, help='number of paths searched concurrently')
+    args = parser.parse_args(args)
+
+    logging.basicConfig(level=logging.INFO)
+
+    report = run(
+        args.paths,
+        args.config,
+        dcc=args.dcc,
+        on_conflict=args.on_conflict,
+        assign_material=args.assign_material,
+        include_subfolders=args.include_subfolders,
+        scene_path=args.scene,
+        dry_run=args.dry_run,
+        max_workers=args.threads)
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=4)
+    else:
+        json.dump(report, sys.stdout, indent=4)
+        sys.stdout.write('\n')
+
+    return 0 if report['success'] else 1
@@ -1,14 +1,26 @@
 import os
-import glob
 import re
+import time
 import logging
-import itertools
 import json
+import collections
+try:
+    from concurrent import futures
+except ImportError:
+    # py2.7
+    futures = None
 
 
+from . import pattern_utils
 from . import plugin_utils
+from . import scan_utils
+from . import timing_utils
 from . import utils
-from .utils import NotFoundException, NoSelectionException
+from .utils import NotFoundException, NoSelectionException, CancelledException
+
+
+# importers that are reused between refreshes, keyed by class name and plugin
+_instances = {}
 
 
 class Importer(object):
@@ -19,6 +31,8 @@ class Importer(object):
     plugin_name = ''
 
     settings_group = ''
+    # timing_utils.CallCounter wrappers of the dcc modules that the plugin uses
+    dcc_modules = ()
     settings_defaults = {
         'material_node_pattern': '{}_mat',
         'file_node_pattern': '{}_tex',
@@ -28,7 +42,18 @@ class Importer(object):
     def __init__(self):
         self.config = None
         self.path = ''
+        self.include_subfolders = False
+        self.index = None
+        self.classifications = {}
+        self.cached_classifications = {}
+        self.cancelled = False
+        self.classify_processes = 0
+        self.naming = None
+        self.use_scan_cache = False
+        self.plugin_loaded = False
+        self.timings = timing_utils.Timings()
         self.settings = utils.Settings()
+        self.scan_cache = scan_utils.ScanCache(os.path.join(self.settings.settings_path, 'cache'))
         self.init_settings()
 
     def init_settings(self):
@@ -43,40 +68,48 @@ class Importer(object):
         cls = plugin_utils.plugin_class(cls, plugin)
         return cls()
 
+    @classmethod
+    def instance(cls, plugin):
+        # settings and the plugin are only set up once, prepare resets the state of a run
+        key = (cls.__name__, plugin)
+        texture_importer = _instances.get(key)
+        if texture_importer is None:
+            texture_importer = _instances[key] = cls.from_plugin(plugin)
+        else:
+            # pick up changes made to settings.ini outside of the tool
+            texture_importer.settings.sync()
+        return texture_importer
+
+    @staticmethod
+    def clear_instances():
+        _instances.clear()
+
+    @classmethod
+    def plugin_info(cls, plugin):
+        # attributes and colorspaces of a plugin without importing it
+        return plugin_utils.plugin_info(cls, plugin)
+
     def load_plugin(self):
         pass
 
-    def resolve_pattern(self, pattern, mesh='*', material='*', udim='[0-9][0-9][0-9][0-9]', mud='_u'):
-        # turn parantheses into optional groups in regex style
-        pattern = re.sub(r'\(([^\|]+?)\)', r'(\g<1>|)', pattern)
-
-        # turn optional patterns into different options
-        options = []
-        matches = re.findall(r'\(.+?\)', pattern)
-        for match in matches:
-            x = [(match, part) for part in match[1:-1].split('|')]
-            options.append(x)
-
-        resolved_patterns = []
-        for option in itertools.product(*options):
-            resolved_pattern = pattern
-            for (key, value) in option:
-                resolved_pattern = re.sub(re.escape(key), value, resolved_pattern)
-
-            if mesh:
-                resolved_pattern = re.sub(r'\$mesh', mesh, resolved_pattern)
-            if material:
-                resolved_pattern = re.sub(r'\$material', material, resolved_pattern)
-            if udim:
-                resolved_pattern = re.sub(r'\$udim', udim, resolved_pattern)
-            resolved_patterns.append(resolved_pattern)
-
-        return resolved_patterns
+    def ensure_plugin(self):
+        # querying the dcc for the plugin is skipped once it was loaded
+        if not self.plugin_loaded:
+            self.load_plugin()
+            self.plugin_loaded = True
 
-    def resolve_name(self, pattern, *args):
+    def read_naming(self):
+        # read once per run on the main thread, changes are picked up by the next run
         self.settings.beginGroup(self.settings_group)
-        pattern_string = self.settings.value(pattern)
+        settings = set(self.settings.childKeys()).union(self.settings_defaults)
+        patterns = {setting: self.settings.value(setting) for setting in settings if setting.endswith('_pattern')}
+        default_name = self.settings.value('default_name', '')
         self.settings.endGroup()
+        return NamingSettings(patterns, default_name)
+
+    def resolve_name(self, pattern, *args):
+        naming = self.naming or self.read_naming()
+        pattern_string = naming.pattern(pattern)
 
         try:
             name = pattern_string.format(*args)
@@ -86,59 +119,120 @@ class Importer(object):
 
         return name
 
-    def glob(self, pattern):
-        if not pattern:
-            return []
-
-        if self.include_subfolders:
-            # python 3.5>= only
-            # files = glob.glob(os.path.join(self.path, '**', pattern), recursive=True)
-            files = glob.glob(os.path.join(self.path, pattern))
+    def get_index(self):
+        # the directory is only listed once per run, all patterns are matched in memory
+        if self.index is None or self.index.path != self.path:
+            self.index = self.create_index(self.path)
+        return self.index
 
-        else:
-            files = glob.glob(os.path.join(self.path, pattern))
-        return files
+    def create_index(self, path):
+        max_depth = self.settings.value('max_subfolder_depth', None)
+        try:
+            max_depth = int(max_depth)
+        except (TypeError, ValueError):
+            max_depth = None
+        if max_depth is not None and max_depth < 0:
+            max_depth = None
+
+        index = scan_utils.DirectoryIndex(
+            path,
+            recursive=self.include_subfolders,
+            max_depth=max_depth,
+            ignore_patterns=self.settings.list('ignore_patterns', numbers=False))
+        return index
 
     def exists(self, node_name):
         return False
 
+    def start_timings(self, name):
+        # a new set of timings for each refresh, import or batch run
+        self.timings = timing_utils.Timings(name)
+        for module in self.dcc_modules:
+            module.timings = self.timings
+        return self.timings
+
+    def exists_many(self, node_names):
+        # returns the set of existing node names, plugins should override this with a single query
+        return set(node_name for node_name in node_names if node_name and self.exists(node_name))
+
     def get_meshes(self):
         return []
 
-    def get_materials(self, mesh=None):
-        channels = self.config.channels
-        materials = []
-        # per mesh loop through channel and find materials
-        for channel in channels:
-            # find all materials per mesh
-            if not re.findall(r'\$material', channel.pattern):
-                continue
+    def classify(self, mesh=None):
+        # every file is matched once against all channels, networks are read from the table
+        mesh_name = mesh.name if mesh else None
+        classification = self.classifications.get(mesh_name)
+        if classification is None:
+            classification = self.create_classification(
+                self.get_index(), mesh_name, self.cached_classifications)
+            self.classifications[mesh_name] = classification
+        return classification
+
+    def create_classification(self, index, mesh_name=None, cached_classifications=None):
+        patterns = self.config.patterns
+        key = pattern_utils.classification_key(patterns, mesh_name)
+        if cached_classifications and key in cached_classifications:
+            self.timings.count('cached_classifications')
+            return pattern_utils.Classification.from_dict(cached_classifications[key])
+
+        if self.classify_processes > 1:
+            # large listings can be matched in a process pool, this needs the full listing
+            index.load()
+            if self.cancelled:
+                raise CancelledException
+            classification = pattern_utils.classify_parallel(
+                patterns, index, mesh=mesh_name, processes=self.classify_processes)
+        else:
+            classification = pattern_utils.Classification(patterns, mesh=mesh_name)
+            for file_path in index:
+                if self.cancelled:
+                    raise CancelledException
+                classification.add(file_path)
+
+        self.timings.count('files_scanned', len(index))
+        # every file is checked against every pattern once
+        self.timings.count('pattern_checks', len(index) * len(patterns))
+        return classification
+
+    def load_cache(self):
+        # restores the listing and classifications if the folders did not change
+        if not self.use_scan_cache:
+            return {}
+        return self.scan_cache.load(self.index)
+
+    def save_cache(self):
+        # runs in the worker, the setting is read by prepare
+        if not self.use_scan_cache:
+            return
+        self.write_cache(self.index, self.classifications.values(), self.cached_classifications)
+
+    def write_cache(self, index, classifications, cached_classifications):
+        # only writes classifications that did not come from the cache
+        data = {}
+        for classification in classifications:
+            if classification.key not in cached_classifications:
+                data[classification.key] = classification.to_dict()
+        if data:
+            index.load()
+            self.scan_cache.save(index, data)
+            cached_classifications.update(data)
 
-            filepaths = []
-            patterns = self.resolve_pattern(channel.pattern, mesh=mesh)
-            for pattern in patterns:
-                filepaths.extend(self.glob(pattern))
-
-            # create one network per material
-            patterns = self.resolve_pattern(channel.pattern, mesh=mesh, material=r'(\\w+?)')
-            for (pattern, filepath) in itertools.product(patterns, filepaths):
-                # if we found a material add it to the list and create a network
-                # resolve_pattern returns a glob pattern. We need to escape .* to make it work for regex.
-                regex_pattern = pattern.replace('.', r'\.').replace('*', r'\w+')
-                match = re.search(regex_pattern, filepath)
-                if match and match.group(1) not in materials:
-                    material = match.group(1)
-                    materials.append(material)
-            break
-        return materials
+    def get_materials(self, mesh=None):
+        return list(self.classify(mesh).materials)
 
     def get_network(self, mesh=None, material=None):
         channels = self.config.channels
+        naming = self.naming or self.read_naming()
 
         network = Network()
         network.mesh = mesh
         network.material = material
 
+        classification = self.classify(mesh)
+        if material:
+            # materials of subfolders are keyed by their folder
+            material = classification.material_name(material)
+
         if mesh and material:
             material_name = '{}_{}'.format(mesh.name, material)
         elif mesh and not material:
@@ -146,46 +240,28 @@ class Importer(object):
         elif not mesh and material:
             material_name = material
         else:
-            material_name = self.settings.value('default_name', '')
+            material_name = naming.default_name
 
         material_node_name = self.resolve_name('material_node_pattern', material_name)
 
         # remove pattern if the filename already contains the pattern
-        self.settings.beginGroup(self.settings_group)
-        pattern_string = self.settings.value('material_node_pattern')
-        self.settings.endGroup()
-        # py3.6 and before
-        try:
-            search_pattern = re.sub(r'{}', r'([\\w\-. ]+)', pattern_string)
-        except KeyError:
-            search_pattern = re.sub(r'{}', r'([\w\-. ]+)', pattern_string)
-
-        match = re.search(search_pattern, material_name)
+        pattern_string = naming.pattern('material_node_pattern')
+        match = node_name_regex(pattern_string).search(material_name)
         if match:
             material_node_name = material_name
             material_name = match.group(1)
 
-        mesh_name = mesh.name if mesh else None
         network.material_name = material_name
         network.material_node_name = material_node_name
-        network.exists = self.exists(material_node_name)
-
-        for channel in channels:
-            patterns = self.resolve_pattern(channel.pattern, mesh=mesh_name, material=material)
-
-            for pattern in patterns:
-                files = self.glob(pattern)
-                if files:
-                    file_path = files[0]
-                    if re.search(r'\$udim', channel.pattern):
-                        # This will not work if file name contains other 4 digit strings but
-                        # it's an easy way to create the file name that works in 99% of cases
-                        file_name = os.path.basename(file_path)
-                        file_name = re.sub(r'\d{4}', '<UDIM>', file_name)
-                        file_path = os.path.join(os.path.dirname(file_path), file_name)
-                    break
+
+        for i, channel in enumerate(channels):
+            match = classification.best_match(network.material, i)
+            if match:
+                file_path = os.path.join(self.path, match.udim_path)
+                udims = classification.udims(network.material, i)
             else:
                 file_path = ''
+                udims = []
 
             material_atttribute = '{}_{}'.format(material_name, channel.attribute)
             file_node_name = self.resolve_name('file_node_pattern', material_atttribute)
@@ -197,7 +273,7 @@ class Importer(object):
             network_channel.attribute_name = channel.attribute
             network_channel.colorspace = channel.colorspace
             network_channel.file_path = file_path
-            network_channel.exists = self.exists(file_node_name)
+            network_channel.udims = udims
 
         if not any([channel.file_path for channel in network.channels]):
             return
@@ -205,40 +281,276 @@ class Importer(object):
         return network
 
     def get_networks(self, path, config, include_subfolders):
+        meshes = self.prepare(path, config, include_subfolders)
+        networks = list(self.iter_networks(meshes))
+        self.update_exists(networks)
+
+        if not networks:
+            raise NotFoundException
+
+        return networks
+
+    def prepare(self, path, config, include_subfolders):
+        # everything that needs the dcc has to run on the main thread before iter_networks,
+        # the scan cache is read by iter_networks in the worker
         self.path = path
         self.config = config
         self.include_subfolders = include_subfolders
+        self.index = self.create_index(path)
+        self.classifications = {}
+        self.cancelled = False
+        self.classify_processes = self.get_classify_processes()
+        self.naming = self.read_naming()
+        self.use_scan_cache = self.settings.bool('use_scan_cache')
+        self.cached_classifications = None
+        self.start_timings('refresh')
+
+        return self.get_selected_meshes(config)
+
+    def get_classify_processes(self):
+        try:
+            return int(self.settings.value('classify_processes', 0))
+        except (TypeError, ValueError):
+            return 0
 
-        networks = []
-
-        meshes = self.get_meshes()
+    def get_selected_meshes(self, config):
+        with self.timings.span('get_meshes'):
+            meshes = self.get_meshes()
         if config.has_mesh and not meshes:
             raise NoSelectionException
         elif not config.has_mesh:
             # ignore mesh
             meshes = [None]
+        return meshes
+
+    def get_networks_many(self, paths, config, include_subfolders, max_workers=4):
+        """Searches many folders concurrently and returns the results per path.
+
+        Listing and classifying the folders is io bound and runs in a thread pool.
+        Networks are built and checked against the scene on the calling thread.
+        Each result has the networks, the scan time, the total time in seconds and an error message.
+        """
+
+        self.config = config
+        self.include_subfolders = include_subfolders
+        self.cancelled = False
+        self.classify_processes = self.get_classify_processes()
+        self.naming = self.read_naming()
+        self.start_timings('batch')
+
+        meshes = self.get_selected_meshes(config)
+        mesh_names = [mesh.name if mesh else None for mesh in meshes]
+        self.use_scan_cache = self.settings.bool('use_scan_cache')
+        indexes = [self.create_index(path) for path in paths]
+
+        def scan(index):
+            start_time = time.time()
+            with self.timings.span('scan'):
+                cached_classifications = self.scan_cache.load(index) if self.use_scan_cache else {}
+                classifications = {}
+                for mesh_name in mesh_names:
+                    classifications[mesh_name] = self.create_classification(
+                        index, mesh_name, cached_classifications)
+                if self.use_scan_cache:
+                    self.write_cache(index, classifications.values(), cached_classifications)
+            return classifications, cached_classifications, time.time() - start_time
+
+        if futures and max_workers > 1 and len(indexes) > 1:
+            with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+                scans = [executor.submit(scan, index) for index in indexes]
+                futures.wait(scans)
+        else:
+            scans = []
+            for index in indexes:
+                scans.append(SequentialResult(scan, index))
+
+        results = collections.OrderedDict()
+        for path, index, future in zip(paths, indexes, scans):
+            result = {
+                'networks': [],
+                'scan_time': 0,
+                'time': 0,
+                'error': None,
+            }
+            results[path] = result
+
+            try:
+                classifications, cached_classifications, scan_time = future.result()
+            except (OSError, IOError, ValueError) as e:
+                result['error'] = str(e)
+                continue
+
+            start_time = time.time()
+            self.path = path
+            self.index = index
+            self.classifications = classifications
+            self.cached_classifications = cached_classifications
+            try:
+                networks = list(self.iter_networks(meshes))
+            except NotFoundException as e:
+                networks = []
+                result['error'] = e.message
+            self.update_exists(networks)
+
+            if not networks and not result['error']:
+                result['error'] = NotFoundException.message
+            result['networks'] = networks
+            result['scan_time'] = scan_time
+            result['time'] = scan_time + time.time() - start_time
+
+        return results
+
+    def iter_networks(self, meshes, progress=None):
+        # only reads the file system, this can run in a worker thread
+        if self.cached_classifications is None:
+            # get_networks_many loads the caches itself
+            with self.timings.span('load_cache'):
+                self.cached_classifications = self.load_cache()
 
         for mesh in meshes:
-            materials = self.get_materials(mesh)
-            if config.has_material and not materials:
+            with self.timings.span('get_materials'):
+                materials = self.get_materials(mesh)
+            if self.config.has_material and not materials:
                 raise NotFoundException
-            elif not config.has_material:
+            elif not self.config.has_material:
                 # ignore material
                 materials = [None]
 
-            for material in materials:
-                network = self.get_network(mesh, material)
+            for i, material in enumerate(materials):
+                if self.cancelled:
+                    raise CancelledException
+                if progress:
+                    progress(i, len(materials))
+
+                with self.timings.span('get_network'):
+                    network = self.get_network(mesh, material)
                 if network:
-                    networks.append(network)
+                    yield network
+
+        with self.timings.span('save_cache'):
+            self.save_cache()
+
+    def update_files(self, meshes, directories):
+        """Lists changed folders again and rebuilds the networks of the materials with changed files.
+
+        Only the added and removed file names are classified, this runs on the main thread.
+        Returns the networks and the keys of all updated networks, keys without a network were removed.
+        """
+
+        self.start_timings('update')
+        index = self.get_index()
+        added = []
+        removed = []
+        with self.timings.span('scan'):
+            for directory in directories:
+                relative_path = os.path.relpath(directory, index.path)
+                if relative_path == os.curdir:
+                    relative_path = ''
+                directory_added, directory_removed = index.refresh_directory(relative_path)
+                added.extend(directory_added)
+                removed.extend(directory_removed)
+        self.timings.count('files_scanned', len(added) + len(removed))
 
-        if not networks:
-            raise NotFoundException
+        networks = []
+        keys = set()
+        if not added and not removed:
+            return networks, keys
 
-        return networks
+        for mesh in meshes:
+            classification = self.classify(mesh)
+            materials = classification.update(added, removed)
+            if not self.config.has_material:
+                materials = set([None])
+            elif None in materials:
+                # a channel that is shared by all materials changed
+                materials.discard(None)
+                materials.update(classification.materials)
+
+            mesh_name = mesh.name if mesh else None
+            for material in materials:
+                # the same key as Network.key
+                keys.add((mesh_name, material))
+                with self.timings.span('get_network'):
+                    network = self.get_network(mesh, material)
+                if network:
+                    networks.append(network)
+        return networks, keys
+
+    def update_exists(self, networks):
+        node_names = set()
+        for network in networks:
+            node_names.add(network.material_node_name)
+            node_names.update(channel.file_node_name for channel in network.channels)
+        node_names.discard('')
+
+        existing_names = set()
+        if node_names:
+            with self.timings.span('exists'):
+                existing_names = self.exists_many(node_names)
+        for network in networks:
+            network.exists = network.material_node_name in existing_names
+            for channel in network.channels:
+                channel.exists = channel.file_node_name in existing_names
+
+    def cancel(self):
+        self.cancelled = True
+
+    def create_networks(self, networks, **kwargs):
+        self.naming = self.read_naming()
+        for i, network in enumerate(networks):
+            kwargs['index'] = i
+            with self.timings.span('create_network'):
+                self.create_network(network, **kwargs)
 
     def create_network(self, network, **kwargs):
         pass
 
+    def save_scene(self, path):
+        pass
+
+
+@pattern_utils.memoize(maxsize=64)
+def node_name_regex(pattern_string):
+    # matches names that already contain a node pattern, such as chrome_mat for {}_mat
+    # py3.6 and before
+    try:
+        search_pattern = re.sub(r'{}', r'([\\w\-. ]+)', pattern_string)
+    except KeyError:
+        search_pattern = re.sub(r'{}', r'([\w\-. ]+)', pattern_string)
+    return re.compile(search_pattern)
+
+
+class NamingSettings(object):
+    """An immutable snapshot of the node name settings that is used for a whole run."""
+
+    __slots__ = ('_patterns', 'default_name')
+
+    def __init__(self, patterns, default_name=''):
+        object.__setattr__(self, '_patterns', dict(patterns))
+        object.__setattr__(self, 'default_name', default_name)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('NamingSettings is read-only')
+
+    def pattern(self, setting):
+        return self._patterns.get(setting)
+
+
+class SequentialResult(object):
+    # runs a function immediately and mimics the result of a future
+    def __init__(self, func, *args):
+        self.exception = None
+        self.value = None
+        try:
+            self.value = func(*args)
+        except Exception as e:
+            self.exception = e
+
+    def result(self):
+        if self.exception is not None:
+            raise self.exception
+        return self.value
+
 
 class Network(object):
     def __init__(self):
@@ -249,6 +561,11 @@ class Network(object):
         self.exists = False
         self.channels = []
 
+    @property
+    def key(self):
+        # identifies the network of a mesh and material between searches
+        return self.mesh.name if self.mesh else None, self.material
+
 
 class NetworkChannel(object):
     def __init__(self, network):
@@ -260,6 +577,7 @@ class NetworkChannel(object):
         self.attribute_name = ''
         self.file_path = ''
         self.colorspace = ''
+        self.udims = []
         self.exists = False
 
         network.channels.append(self)
@@ -304,19 +622,22 @@ class Config(object):
         with open(json_path, 'w') as f:
             json.dump(json_data, f, indent=4)
 
+    @property
+    def patterns(self):
+        return tuple(channel.pattern for channel in self.channels)
+
+    @property
+    def tokens(self):
+        # cached by the patterns, edited channels get a new set
+        return pattern_utils.pattern_tokens(self.patterns)
+
     @property
     def has_mesh(self):
-        for channel in self.channels:
-            if re.search(r'\$mesh', channel.pattern):
-                return True
-        return False
+        return 'mesh' in self.tokens
 
     @property
     def has_material(self):
-        for channel in self.channels:
-            if re.search(r'\$material', channel.pattern):
-                return True
-        return False
+        return 'material' in self.tokens
 
 
 class ConfigChannel(object):
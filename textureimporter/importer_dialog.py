@@ -10,8 +10,10 @@ from . import importer
 from . import networks_dialog
 from . import gui_utils
 from . import plugin_utils
+from . import scan_utils
+from . import timing_utils
 from . import utils
-from .utils import NotFoundException, NoSelectionException
+from .utils import NotFoundException, NoSelectionException, CancelledException
 from . import setup
 
 
@@ -24,6 +26,21 @@ class ImporterDialog(QtWidgets.QDialog):
 
         self.dcc = dcc
         self.settings = utils.Settings()
+        self.importer = None
+        self.worker = None
+        self.thread_pool = QtCore.QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(1)
+        self.pending_networks = []
+        self.networks_found = 0
+        self.pending_timer = QtCore.QTimer(self)
+        self.pending_timer.setSingleShot(True)
+        self.pending_timer.setInterval(100)
+        self.pending_timer.timeout.connect(self.add_pending_networks)
+        self.meshes = []
+        # the listing of the last search that finished, only complete listings are watched
+        self.watch_index = None
+        self.watcher = PathWatcher(self)
+        self.watcher.changed.connect(self.watched_directories_changed)
 
         self.load_config_files()
 
@@ -137,7 +154,8 @@ class ImporterDialog(QtWidgets.QDialog):
         self.path_browse_btn.clicked.connect(self.browse_path)
         self.config_cmb.currentTextChanged.connect(self.config_changed)
 
-        self.networks_wdg.refresh_btn.clicked.connect(self.refresh)
+        self.networks_wdg.refresh_btn.clicked.connect(self.refresh_clicked)
+        self.watch_chk.toggled.connect(self.watch_toggled)
 
         self.create_btn.clicked.connect(self.accept)
         self.cancel_btn.clicked.connect(self.reject)
@@ -264,33 +282,33 @@ class ImporterDialog(QtWidgets.QDialog):
     def refresh(self):
         self.save_config()
         self.save_settings()
-
-        self.networks_wdg.networks_tree.clear()
+        self.cancel_refresh()
+        self.watcher.stop()
+        self.watch_index = None
 
         path = self.path_cmb.currentText()
         config = self.config_cmb.currentData()
-        # include_subfolders = self.subfolders_chk.isChecked()
-        include_subfolders = False
+        include_subfolders = self.subfolders_chk.isChecked()
 
         if not config.renderer:
             self.status_bar.showMessage('Failed to read config', 1000)
             return
 
         plugin = '{}_{}'.format(self.dcc, config.renderer)
-        self.importer = importer.Importer.from_plugin(plugin)
+        texture_importer = importer.Importer.instance(plugin)
 
         try:
-            self.importer.load_plugin()
+            texture_importer.ensure_plugin()
         except RuntimeError:
             QtWidgets.QMessageBox.warning(
                 self,
                 'Plugin Load Error',
-                'Unable to load plugin: {}'.format(self.importer.plugin_name),
+                'Unable to load plugin: {}'.format(texture_importer.plugin_name),
                 QtWidgets.QMessageBox.Ok)
             return
 
         try:
-            networks = self.importer.get_networks(path, config, include_subfolders)
+            meshes = texture_importer.prepare(path, config, include_subfolders)
         except NoSelectionException:
             QtWidgets.QMessageBox.information(
                 self,
@@ -298,18 +316,168 @@ class ImporterDialog(QtWidgets.QDialog):
                 'No meshes selected.\nA pattern in the config contains "$mesh".',
                 QtWidgets.QMessageBox.Ok)
             return
-        except NotFoundException:
+
+        # networks of another renderer are not updated, they can't be created with this importer
+        networks_tree = self.networks_wdg.networks_tree
+        if self.importer is None or self.importer.plugin_name != texture_importer.plugin_name:
+            networks_tree.clear()
+        self.importer = texture_importer
+        self.meshes = meshes
+        self.networks_found = 0
+
+        # the file system is searched in a worker, found networks update the displayed networks
+        networks_tree.begin_update()
+        self.worker = DiscoveryWorker(self.importer, meshes)
+        self.worker.signals.network_found.connect(self.network_found)
+        self.worker.signals.progress.connect(self.refresh_progress)
+        self.worker.signals.failed.connect(self.refresh_failed)
+        self.worker.signals.finished.connect(self.refresh_finished)
+
+        self.main_prgbar.setRange(0, 0)
+        self.main_prgbar.setVisible(True)
+        self.networks_wdg.refresh_btn.setText('Cancel')
+        # the worker uses the same importer, networks are only created after the search
+        self.create_btn.setEnabled(False)
+        self.status_bar.showMessage('Searching for textures...')
+
+        self.thread_pool.start(self.worker)
+
+    def cancel_refresh(self):
+        if self.worker is None:
+            return
+        self.worker.cancel()
+        self.thread_pool.waitForDone()
+        self.worker = None
+        self.pending_timer.stop()
+        self.pending_networks = []
+        # keep networks that have not been found yet
+        self.networks_wdg.networks_tree.end_update(remove_stale=False)
+        self.reset_progress()
+
+    def refresh_clicked(self):
+        if self.worker is not None:
+            self.cancel_refresh()
+            self.status_bar.showMessage('Search cancelled.', 1000)
+        else:
+            self.refresh()
+
+    def is_current_worker(self):
+        # ignore queued signals of cancelled workers
+        return self.worker is not None and self.sender() is self.worker.signals
+
+    def network_found(self, network):
+        if not self.is_current_worker():
+            return
+
+        # networks are collected so the scene is queried once per batch
+        self.pending_networks.append(network)
+        if not self.pending_timer.isActive():
+            self.pending_timer.start()
+
+    def add_pending_networks(self):
+        self.pending_timer.stop()
+        networks = self.pending_networks
+        self.pending_networks = []
+        if not networks:
+            return
+
+        # dcc queries have to happen on the main thread
+        self.importer.update_exists(networks)
+        with self.importer.timings.span('add_networks'):
+            self.networks_wdg.networks_tree.add_networks(networks)
+
+        self.networks_found += len(networks)
+        self.status_bar.showMessage('Searching for textures... {} found'.format(self.networks_found))
+
+    def refresh_progress(self, value, maximum):
+        if not self.is_current_worker():
+            return
+        self.main_prgbar.setRange(0, maximum)
+        self.main_prgbar.setValue(value)
+
+    def refresh_failed(self, exception):
+        if not self.is_current_worker():
+            return
+
+        if isinstance(exception, NotFoundException):
             QtWidgets.QMessageBox.information(
                 self,
                 'Nothing to Import',
                 'No textures found.',
                 QtWidgets.QMessageBox.Ok)
+        else:
+            logging.error(exception)
+            self.status_bar.showMessage('Failed to search for textures. Please see log.', 2000)
+
+    def refresh_finished(self):
+        if not self.is_current_worker():
             return
 
-        self.networks_wdg.networks_tree.clear()
-        self.networks_wdg.networks_tree.add_networks(networks)
+        self.add_pending_networks()
+        networks_tree = self.networks_wdg.networks_tree
+        error = self.worker.error
+        if isinstance(error, NotFoundException):
+            # the search finished without finding any material
+            error = None
+        with self.importer.timings.span('add_networks'):
+            # networks that were not found again are removed unless the search failed
+            networks_tree.end_update(remove_stale=error is None)
+            networks_tree.sort_networks()
+            networks_tree.resize_columns()
+        count = len(networks_tree.networks)
+        if not count and self.worker.error is None:
+            self.refresh_failed(NotFoundException())
+        else:
+            timings = self.importer.timings
+            self.status_bar.showMessage(
+                'Found {} networks in {:.2f}s: {}'.format(count, timings.elapsed, timings.summary()), 5000)
+        self.log_timings()
+
+        self.worker = None
+        self.reset_progress()
+
+        if error is None:
+            self.watch_index = self.importer.index
+            if self.watch_chk.isChecked():
+                self.watcher.watch(self.watch_index)
+
+    def watch_toggled(self, checked):
+        if not checked:
+            self.watcher.stop()
+        elif self.watch_index is not None:
+            # folders that changed since the last search are updated right away
+            self.watcher.watch(self.watch_index)
+
+    def watched_directories_changed(self, directories):
+        if self.watch_index is None:
+            return
+
+        networks, keys = self.importer.update_files(self.meshes, directories)
+        if keys:
+            # dcc queries have to happen on the main thread
+            self.importer.update_exists(networks)
+            networks_tree = self.networks_wdg.networks_tree
+            with self.importer.timings.span('add_networks'):
+                networks_tree.replace_networks(networks, keys)
+                networks_tree.sort_networks()
+            timings = self.importer.timings
+            self.status_bar.showMessage(
+                'Updated {} networks in {:.2f}s'.format(len(keys), timings.elapsed), 5000)
+            self.log_timings()
+
+        # new subfolders are watched as well
+        self.watcher.watch(self.watch_index)
+
+    def reset_progress(self):
+        self.main_prgbar.setVisible(False)
+        self.networks_wdg.refresh_btn.setText('Refresh')
+        self.create_btn.setEnabled(True)
 
     def accept(self):
+        if self.worker is not None:
+            self.status_bar.showMessage('Searching for textures...', 1000)
+            return
+
         networks = self.networks_wdg.selected_networks()
 
         if not networks:
@@ -321,17 +489,28 @@ class ImporterDialog(QtWidgets.QDialog):
             'assign_material': self.networks_wdg.assign_chk.isChecked()
         }
 
-        for i, network in enumerate(networks):
-            kwargs['index'] = i
-            self.importer.create_network(network, **kwargs)
+        timings = self.importer.start_timings('import')
+        self.importer.create_networks(networks, **kwargs)
+        self.log_timings()
+
+        self.status_bar.showMessage(
+            'Successfully created all shading networks in {:.2f}s: {}'.format(
+                timings.elapsed, timings.summary()), 5000)
 
-        self.status_bar.showMessage('Successfully created all shading networks', 2000)
+    def log_timings(self):
+        if self.settings.bool('log_timings'):
+            path = os.path.join(self.settings.settings_path, 'timings.log')
+            timing_utils.write_log(self.importer.timings, path)
 
     def reject(self):
+        self.cancel_refresh()
+        self.watcher.stop()
         self.save_settings()
         super(ImporterDialog, self).reject()
 
     def closeEvent(self, event):
+        self.cancel_refresh()
+        self.watcher.stop()
         self.save_settings()
         event.accept()
 
@@ -341,6 +520,8 @@ class ImporterDialog(QtWidgets.QDialog):
         self.settings.setValue('importer_dialog/splitter', self.splitter.sizes())
         self.settings.setValue('importer/current_config', self.config_cmb.currentText())
         self.settings.setValue('importer/current_path', self.path_cmb.currentText())
+        self.settings.setValue('importer/include_subfolders', self.subfolders_chk.isChecked())
+        self.settings.setValue('importer/watch_path', self.watch_chk.isChecked())
         self.settings.setValue('importer/on_conflict', self.networks_wdg.conflict_cmb.currentData())
         self.settings.setValue('importer/assign_materials', self.networks_wdg.assign_chk.isChecked())
 
@@ -365,6 +546,9 @@ class ImporterDialog(QtWidgets.QDialog):
         index = self.path_cmb.findText(self.settings.value('importer/current_path', ''))
         self.path_cmb.setCurrentIndex(max(0, index))
 
+        self.subfolders_chk.setChecked(self.settings.bool('importer/include_subfolders'))
+        self.watch_chk.setChecked(self.settings.bool('importer/watch_path'))
+
         on_conflict = self.settings.value('importer/on_conflict', 'rename')
         current_index = self.networks_wdg.conflict_cmb.findData(on_conflict)
         current_index = max(0, current_index)
@@ -383,6 +567,8 @@ class ImporterDialog(QtWidgets.QDialog):
             QtWidgets.QMessageBox.Yes | QtWidgets.QMessageBox.No)
         if result == QtWidgets.QMessageBox.Yes:
             self.settings.clear()
+            # the defaults of the importers are written again on the next refresh
+            importer.Importer.clear_instances()
 
     def open_configs_dir(self):
         os.startfile(self.settings.configs_path)
@@ -446,6 +632,98 @@ class ImporterDialog(QtWidgets.QDialog):
         webbrowser.open('https://github.com/beatreichenbach/texture-importer')
 
 
+class DiscoverySignals(QtCore.QObject):
+    network_found = QtCore.Signal(object)
+    progress = QtCore.Signal(int, int)
+    failed = QtCore.Signal(object)
+    finished = QtCore.Signal()
+
+
+class DiscoveryWorker(QtCore.QRunnable):
+    def __init__(self, importer, meshes):
+        super(DiscoveryWorker, self).__init__()
+
+        self.importer = importer
+        self.meshes = meshes
+        self.cancelled = False
+        self.error = None
+        self.signals = DiscoverySignals()
+
+    def run(self):
+        try:
+            for network in self.importer.iter_networks(self.meshes, progress=self.signals.progress.emit):
+                self.signals.network_found.emit(network)
+        except CancelledException:
+            pass
+        except Exception as e:
+            self.error = e
+            self.signals.failed.emit(e)
+        finally:
+            self.signals.finished.emit()
+
+    def cancel(self):
+        self.cancelled = True
+        self.importer.cancel()
+
+
+class PathWatcher(QtCore.QObject):
+    """Watches the folders of a directory index and reports changed folders once they settle.
+
+    Exports write many files at once, the folders are collected until nothing
+    changed for the delay in milliseconds.
+    """
+
+    changed = QtCore.Signal(list)
+
+    def __init__(self, parent=None, delay=500):
+        super(PathWatcher, self).__init__(parent)
+
+        self.paths = set()
+        self.changed_directories = set()
+        self.watcher = QtCore.QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self.directory_changed)
+        self.timer = QtCore.QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay)
+        self.timer.timeout.connect(self.emit_changed)
+
+    def watch(self, index):
+        stamps = {}
+        for relative_path, stamp in index.directories.items():
+            path = os.path.join(index.path, relative_path) if relative_path else index.path
+            stamps[os.path.normpath(path)] = stamp
+
+        removed_paths = self.paths - set(stamps)
+        if removed_paths:
+            self.watcher.removePaths(list(removed_paths))
+        added_paths = [path for path in stamps if path not in self.paths]
+        if added_paths:
+            self.watcher.addPaths(added_paths)
+        self.paths = set(stamps)
+
+        # folders that changed after they were listed
+        for path in added_paths:
+            if scan_utils.directory_stamp(path) != stamps[path]:
+                self.directory_changed(path)
+
+    def stop(self):
+        self.timer.stop()
+        self.changed_directories = set()
+        if self.paths:
+            self.watcher.removePaths(list(self.paths))
+        self.paths = set()
+
+    def directory_changed(self, path):
+        self.changed_directories.add(os.path.normpath(path))
+        self.timer.start()
+
+    def emit_changed(self):
+        directories = sorted(self.changed_directories)
+        self.changed_directories = set()
+        if directories:
+            self.changed.emit(directories)
+
+
 class ListWidget(QtWidgets.QWidget):
     items_changed = QtCore.Signal(object)
 
@@ -695,7 +973,7 @@ class ChannelWidget(QtWidgets.QWidget):
 
     @attributes.setter
     def attributes(self, attributes):
-        attributes.sort()
+        attributes = sorted(attributes)
         self.attribute_cmb.blockSignals(True)
         self.attribute_cmb.clear()
         self.attribute_cmb.addItems(attributes)
@@ -737,7 +1015,7 @@ class ConfigWidget(QtWidgets.QWidget):
 
         self.dcc = dcc
         self.renderers = plugin_utils.render_plugins(self.dcc)
-        self.importer = importer.Importer()
+        self.plugin_info = plugin_utils.PluginInfo()
 
         self._load_ui()
 
@@ -757,19 +1035,19 @@ class ConfigWidget(QtWidgets.QWidget):
     def list_items_changed(self, item):
         if item is not None:
             item.widget.attribute_cmb.currentIndexChanged.connect(self.lock_channels)
-            item.widget.attributes = self.importer.attributes
-            item.widget.colorspaces = self.importer.colorspaces
+            item.widget.attributes = self.plugin_info.attributes
+            item.widget.colorspaces = self.plugin_info.colorspaces
         self.lock_channels()
 
     def renderer_changed(self, text=None):
         renderer = self.renderer_cmb.currentData()
         if renderer:
             plugin = '{}_{}'.format(self.dcc, renderer)
-            self.importer = importer.Importer.from_plugin(plugin)
+            self.plugin_info = importer.Importer.plugin_info(plugin)
 
             for item in self.list_wdg.items():
-                item.widget.attributes = self.importer.attributes
-                item.widget.colorspaces = self.importer.colorspaces
+                item.widget.attributes = self.plugin_info.attributes
+                item.widget.colorspaces = self.plugin_info.colorspaces
 
     def lock_channels(self):
         # find a better name for this. The function enables unused / disables used items.
@@ -1,3 +1,4 @@
+import copy
 import logging
 import os
 
@@ -22,11 +23,10 @@ class NetworksWidget(QtWidgets.QWidget):
         self.resize(800, 600)
 
         placeholder = self.networks_tree
-        self.networks_tree = NetworksTreeWidget(self.networks_tree)
-        self.networks_tree.setHeaderLabels(('Material', 'Node Name', 'Status', 'File Name'))
+        self.networks_tree = NetworksTreeView(self.networks_tree)
         self.networks_tree.setSortingEnabled(True)
         self.networks_tree.sortByColumn(0, QtCore.Qt.AscendingOrder)
-        self.networks_tree.setSelectionMode(self.networks_tree.ExtendedSelection)
+        self.networks_tree.setSelectionMode(QtWidgets.QAbstractItemView.ExtendedSelection)
         self.networks_tree.setAlternatingRowColors(True)
         self.layout().insertWidget(self.layout().indexOf(placeholder), self.networks_tree)
         self.layout().removeWidget(placeholder)
@@ -69,22 +69,7 @@ class NetworksWidget(QtWidgets.QWidget):
     def selected_networks(self):
         self.save_settings()
 
-        self.networks = []
-        for i in range(self.networks_tree.topLevelItemCount()):
-            item = self.networks_tree.topLevelItem(i)
-            network = item.data(0, QtCore.Qt.UserRole)
-            if not item.checkState(0):
-                continue
-
-            network.channels = []
-            for j in range(item.childCount()):
-                child = item.child(j)
-                channel = child.data(0, QtCore.Qt.UserRole)
-                # ignore checked items without file path
-                if child.checkState(0) and channel.file_path:
-                    network.channels.append(channel)
-
-            self.networks.append(network)
+        self.networks = self.networks_tree.model().checked_networks()
         return self.networks
 
     def conflict_changed(self):
@@ -97,46 +82,402 @@ class NetworksWidget(QtWidgets.QWidget):
             self.assign_chk.setEnabled(True)
 
 
-class SortTreeWidgetItem(QtWidgets.QTreeWidgetItem):
-    def __init__(self, *args):
-        super(SortTreeWidgetItem, self).__init__(*args)
-        self._sortData = {}
+# internal pointer of the network indexes
+ROOT = object()
+
+
+class NetworkItem(object):
+    # a top level row, the check states of the channels are stored here
+    __slots__ = ('network', 'row', 'checked')
+
+    def __init__(self, network, row):
+        self.network = network
+        self.row = row
+        self.checked = [not network.exists] * len(network.channels)
+
 
-    def __lt__(self, other):
-        if not isinstance(other, SortTreeWidgetItem):
-            return super(SortTreeWidgetItem, self).__lt__(other)
+class NetworksModel(QtCore.QAbstractItemModel):
+    """Shows networks as top level rows and their channels as children.
 
-        tree = self.treeWidget()
-        column = tree.sortColumn() if tree else 0
+    The view only receives the rows it fetches while scrolling, so adding networks
+    does not lay out the whole tree again. Indexes of the channels are created when
+    the view asks for them and point to the NetworkItem of their network.
 
-        return self.sortData(column) < other.sortData(column)
+    Between begin_update and end_update, networks replace the displayed networks with
+    the same material_node_name so the check states and expanded rows are kept.
+    """
 
-    def sortData(self, column):
-        return self._sortData.get(column, self.text(column))
+    headers = ('Material', 'Node Name', 'Status', 'File Name')
+    fetch_size = 200
+    item_flags = QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsSelectable
+    check_flags = item_flags | QtCore.Qt.ItemIsUserCheckable
 
-    def setSortData(self, column, data):
-        self._sortData[column] = data
+    def __init__(self, parent=None, style=None):
+        super(NetworksModel, self).__init__(parent)
+
+        self.items = []
+        # the number of rows the view knows about
+        self.fetched = 0
+        # material_node_name: [NetworkItem] that were not found again during an update
+        self.stale = None
+        style = style or QtWidgets.QApplication.style()
+        self.icons = {
+            'warning': style.standardIcon(QtWidgets.QStyle.SP_MessageBoxWarning),
+            'apply': style.standardIcon(QtWidgets.QStyle.SP_DialogApplyButton),
+            'cancel': style.standardIcon(QtWidgets.QStyle.SP_DialogCancelButton),
+        }
+
+    @property
+    def networks(self):
+        return [item.network for item in self.items]
+
+    def clear(self):
+        self.beginResetModel()
+        self.items = []
+        self.fetched = 0
+        if self.stale is not None:
+            self.stale = {}
+        self.endResetModel()
+
+    def begin_update(self):
+        self.stale = {}
+        for item in self.items:
+            self.stale.setdefault(item.network.material_node_name, []).append(item)
+
+    def end_update(self, remove_stale=True):
+        stale = self.stale
+        self.stale = None
+        if not stale or not remove_stale:
+            return
+
+        stale = set(item for items in stale.values() for item in items)
+        # rows the view has not fetched are removed without signals
+        self.items[self.fetched:] = [item for item in self.items[self.fetched:] if item not in stale]
+        self.update_rows(self.fetched)
+
+        rows = sorted((item.row for item in stale if item.row < self.fetched), reverse=True)
+        while rows:
+            # remove consecutive rows at once, starting at the bottom
+            end = start = rows.pop(0)
+            while rows and rows[0] == start - 1:
+                start = rows.pop(0)
+            self.beginRemoveRows(QtCore.QModelIndex(), start, end)
+            del self.items[start:end + 1]
+            self.fetched -= end - start + 1
+            self.update_rows(start)
+            self.endRemoveRows()
+
+    def replace_networks(self, networks, keys):
+        # replaces the displayed networks with these keys, the other networks are not touched
+        self.begin_update()
+        for items in self.stale.values():
+            items[:] = [item for item in items if item.network.key in keys]
+        self.add_networks(networks)
+        self.end_update()
+
+    def update_rows(self, start=0):
+        for row in range(start, len(self.items)):
+            self.items[row].row = row
+
+    def add_networks(self, networks):
+        if self.stale is not None:
+            new_networks = []
+            for network in networks:
+                items = self.stale.get(network.material_node_name)
+                if items:
+                    self.update_item(items.pop(0), network)
+                else:
+                    new_networks.append(network)
+            networks = new_networks
+
+        start = len(self.items)
+        for i, network in enumerate(networks):
+            self.items.append(NetworkItem(network, start + i))
+
+        # the first page is shown right away, the rest is fetched when scrolling
+        if self.fetched < self.fetch_size:
+            self.fetch_rows(self.fetch_size - self.fetched)
+
+    def update_item(self, item, network):
+        # keep the check states of channels with the same attribute
+        checked = dict(zip((channel.attribute_name for channel in item.network.channels), item.checked))
+        new_checked = [checked.get(channel.attribute_name, not network.exists) for channel in network.channels]
+
+        changed = self.network_state(network) != self.network_state(item.network)
+        if item.row >= self.fetched or not changed:
+            item.network = network
+            item.checked = new_checked
+            return
+
+        index = self.createIndex(item.row, 0, ROOT)
+        if len(new_checked) != len(item.checked):
+            if item.checked:
+                self.beginRemoveRows(index, 0, len(item.checked) - 1)
+                item.checked = []
+                self.endRemoveRows()
+            item.network = network
+            if new_checked:
+                self.beginInsertRows(index, 0, len(new_checked) - 1)
+                item.checked = new_checked
+                self.endInsertRows()
+        else:
+            item.network = network
+            item.checked = new_checked
+            if new_checked:
+                self.dataChanged.emit(
+                    self.index(0, 0, index), self.index(len(new_checked) - 1, len(self.headers) - 1, index))
+        self.dataChanged.emit(index, self.index(item.row, len(self.headers) - 1))
+
+    def fetch_rows(self, count):
+        count = min(count, len(self.items) - self.fetched)
+        if count <= 0:
+            return
+        self.beginInsertRows(QtCore.QModelIndex(), self.fetched, self.fetched + count - 1)
+        self.fetched += count
+        self.endInsertRows()
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and self.fetched < len(self.items)
+
+    def fetchMore(self, parent):
+        if not parent.isValid():
+            self.fetch_rows(self.fetch_size)
+
+    def checked_networks(self):
+        # copies of the checked networks with only the checked channels
+        networks = []
+        for item in self.items:
+            if not any(item.checked):
+                continue
+            network = copy.copy(item.network)
+            # ignore checked channels without file path
+            network.channels = [
+                channel for channel, checked in zip(item.network.channels, item.checked)
+                if checked and channel.file_path]
+            networks.append(network)
+        return networks
+
+    def check_all(self, checkstate):
+        checked = checkstate == QtCore.Qt.Checked
+        for item in self.items:
+            item.checked = [checked] * len(item.checked)
+        for row in range(self.fetched):
+            self.emit_check_changed(self.index(row, 0))
+
+    def set_check_state(self, indexes, checkstate):
+        rows = set(index.row() for index in indexes if not self.parent(index).isValid())
+        for index in indexes:
+            item = index.internalPointer()
+            if isinstance(item, NetworkItem) and item.row not in rows:
+                self.setData(index, checkstate, QtCore.Qt.CheckStateRole)
+        for row in rows:
+            self.setData(self.index(row, 0), checkstate, QtCore.Qt.CheckStateRole)
+
+    def emit_check_changed(self, index):
+        roles = [QtCore.Qt.CheckStateRole]
+        self.dataChanged.emit(index, index, roles)
+        item = index.internalPointer()
+        if isinstance(item, NetworkItem):
+            parent = self.createIndex(item.row, 0, ROOT)
+            self.dataChanged.emit(parent, parent, roles)
+        else:
+            count = len(self.items[index.row()].checked)
+            if count:
+                self.dataChanged.emit(self.index(0, 0, index), self.index(count - 1, 0, index), roles)
+
+    def index(self, row, column, parent=QtCore.QModelIndex()):
+        # called for every row, the bounds are checked without hasIndex
+        if row < 0 or not 0 <= column < len(self.headers):
+            return QtCore.QModelIndex()
+        if not parent.isValid():
+            if row < self.fetched:
+                return self.createIndex(row, column, ROOT)
+        elif parent.column() == 0 and not isinstance(parent.internalPointer(), NetworkItem):
+            item = self.items[parent.row()]
+            if row < len(item.checked):
+                return self.createIndex(row, column, item)
+        return QtCore.QModelIndex()
+
+    def parent(self, index=None):
+        if index is None:
+            return super(NetworksModel, self).parent()
+        if not index.isValid():
+            return QtCore.QModelIndex()
+        item = index.internalPointer()
+        if isinstance(item, NetworkItem):
+            return self.createIndex(item.row, 0, ROOT)
+        return QtCore.QModelIndex()
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if not parent.isValid():
+            return self.fetched
+        if parent.column() == 0 and not isinstance(parent.internalPointer(), NetworkItem):
+            return len(self.items[parent.row()].checked)
+        return 0
+
+    def hasChildren(self, parent=QtCore.QModelIndex()):
+        return self.rowCount(parent) > 0 or self.canFetchMore(parent)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return len(self.headers)
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if orientation == QtCore.Qt.Horizontal and role == QtCore.Qt.DisplayRole:
+            return self.headers[section]
+
+    def flags(self, index):
+        if not index.isValid():
+            return QtCore.Qt.NoItemFlags
+        return self.check_flags if index.column() == 0 else self.item_flags
+
+    def check_state(self, index):
+        item = index.internalPointer()
+        if isinstance(item, NetworkItem):
+            return QtCore.Qt.Checked if item.checked[index.row()] else QtCore.Qt.Unchecked
+
+        checked = self.items[index.row()].checked
+        if checked and all(checked):
+            return QtCore.Qt.Checked
+        elif any(checked):
+            return QtCore.Qt.PartiallyChecked
+        return QtCore.Qt.Unchecked
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        item = index.internalPointer()
+        column = index.column()
+        if isinstance(item, NetworkItem):
+            channel = item.network.channels[index.row()]
+            if role == QtCore.Qt.DisplayRole:
+                return self.channel_text(channel, column)
+            elif role == QtCore.Qt.DecorationRole and column == 2:
+                if not channel.file_path:
+                    return self.icons['cancel']
+                return self.icons['warning'] if channel.exists else self.icons['apply']
+            elif role == QtCore.Qt.UserRole:
+                return channel
+        else:
+            network = self.items[index.row()].network
+            if role == QtCore.Qt.DisplayRole:
+                return self.network_text(network, column)
+            elif role == QtCore.Qt.DecorationRole and column == 2:
+                return self.icons['warning'] if network.exists else self.icons['apply']
+            elif role == QtCore.Qt.UserRole:
+                return network
+
+        if role == QtCore.Qt.CheckStateRole and column == 0:
+            return self.check_state(index)
+        return None
+
+    def setData(self, index, value, role=QtCore.Qt.EditRole):
+        if role != QtCore.Qt.CheckStateRole or not index.isValid() or index.column() != 0:
+            return False
+
+        checked = value == QtCore.Qt.Checked
+        item = index.internalPointer()
+        if isinstance(item, NetworkItem):
+            # a channel, the network shows the combined state
+            item.checked[index.row()] = checked
+        else:
+            item = self.items[index.row()]
+            item.checked = [checked] * len(item.checked)
+        self.emit_check_changed(index)
+        return True
+
+    def sort(self, column, order=QtCore.Qt.AscendingOrder):
+        # only networks are sorted, channels keep the order of the config
+        if column < 0 or not self.items:
+            return
+
+        self.layoutAboutToBeChanged.emit()
+        persistent_indexes = []
+        for index in self.persistentIndexList():
+            item = index.internalPointer()
+            if not isinstance(item, NetworkItem):
+                item = self.items[index.row()]
+            persistent_indexes.append((index, item))
+
+        self.items.sort(
+            key=lambda item: self.sort_key(item.network, column),
+            reverse=order == QtCore.Qt.DescendingOrder)
+        for row, item in enumerate(self.items):
+            item.row = row
+
+        for index, item in persistent_indexes:
+            if item.row >= self.fetched:
+                # moved to a row the view has not fetched yet
+                self.changePersistentIndex(index, QtCore.QModelIndex())
+            elif isinstance(index.internalPointer(), NetworkItem):
+                self.changePersistentIndex(index, self.createIndex(index.row(), index.column(), item))
+            else:
+                self.changePersistentIndex(index, self.createIndex(item.row, index.column(), ROOT))
+        self.layoutChanged.emit()
+
+    @staticmethod
+    def network_state(network):
+        # everything the rows show of a network
+        channels = tuple(
+            (channel.attribute_name, channel.file_node_name, channel.file_path, channel.exists)
+            for channel in network.channels)
+        return network.material_name, network.material_node_name, network.exists, channels
+
+    @staticmethod
+    def sort_key(network, column):
+        if column == 1:
+            return network.material_node_name
+        elif column == 2:
+            return network.exists
+        return network.material_name
+
+    @staticmethod
+    def network_text(network, column):
+        if column == 0:
+            return network.material_name
+        elif column == 1:
+            return network.material_node_name
+        elif column == 2 and network.exists:
+            return 'Node exists'
+        return ''
+
+    @staticmethod
+    def channel_text(channel, column):
+        if column == 0:
+            return channel.attribute_name
+        elif column == 1:
+            return channel.file_node_name
+        elif column == 2:
+            if not channel.file_path:
+                return 'Not Found'
+            elif channel.exists:
+                return 'Node exists'
+            return ''
+        return os.path.basename(channel.file_path)
 
 
-class NetworksTreeWidget(QtWidgets.QTreeWidget):
+class NetworksTreeView(QtWidgets.QTreeView):
     def __init__(self, *args):
-        super(NetworksTreeWidget, self).__init__(*args)
+        super(NetworksTreeView, self).__init__(*args)
 
-        self.networks = []
+        self.setModel(NetworksModel(self, self.style()))
+        self.setUniformRowHeights(True)
+        self.columns_resized = False
 
         self.setContextMenuPolicy(QtCore.Qt.CustomContextMenu)
         self.customContextMenuRequested.connect(self.context_menu)
 
-        self.setStyleSheet('QTreeWidget::item {padding: 5px 20px 5px 0;}')
+        self.setStyleSheet('QTreeView::item {padding: 5px 20px 5px 0;}')
+
+    @property
+    def networks(self):
+        return self.model().networks
 
     def check_all_items(self, checkstate):
-        for i in range(self.topLevelItemCount()):
-            item = self.topLevelItem(i)
-            item.setCheckState(0, checkstate)
+        self.model().check_all(checkstate)
 
     def check_selected_items(self, checkstate):
-        for item in self.selectedItems():
-            item.setCheckState(0, checkstate)
+        self.model().set_check_state(self.selectionModel().selectedRows(), checkstate)
 
     def context_menu(self, pos):
         menu = QtWidgets.QMenu(self)
@@ -146,55 +487,52 @@ class NetworksTreeWidget(QtWidgets.QTreeWidget):
         action.triggered.connect(lambda: self.check_selected_items(QtCore.Qt.Unchecked))
         menu.exec_(self.viewport().mapToGlobal(pos))
 
-    def add_networks(self, networks):
-        for network in networks:
-            self.add_network(network)
+    def clear(self):
+        self.model().clear()
+        self.columns_resized = False
 
-    def add_network(self, network):
-        self.networks.append(network)
+    def begin_update(self):
+        # networks that are added replace the displayed networks with the same node name
+        self.model().begin_update()
 
-        item = SortTreeWidgetItem([network.material_name, network.material_node_name])
-        item.setFlags(item.flags() | QtCore.Qt.ItemIsTristate | QtCore.Qt.ItemIsUserCheckable)
-        item.setData(0, QtCore.Qt.UserRole, network)
-        item.setSortData(0, network.material_name)
+    def end_update(self, remove_stale=True):
+        self.model().end_update(remove_stale)
 
-        if network.exists:
-            icon = self.style().standardIcon(QtWidgets.QStyle.SP_MessageBoxWarning)
-            item.setText(2, 'Node exists')
-            item.setCheckState(0, QtCore.Qt.Unchecked)
-        else:
-            icon = self.style().standardIcon(QtWidgets.QStyle.SP_DialogApplyButton)
-            item.setCheckState(0, QtCore.Qt.Checked)
-        item.setSortData(2, network.exists)
-        item.setIcon(2, icon)
-
-        children = []
-        for i, channel in enumerate(network.channels):
-            file_name = os.path.basename(channel.file_path)
-            child = SortTreeWidgetItem([channel.attribute_name, channel.file_node_name, None, file_name])
-            child.setFlags(child.flags() | QtCore.Qt.ItemIsUserCheckable)
-            child.setData(0, QtCore.Qt.UserRole, channel)
-            child.setSortData(0, i)
-            child.setCheckState(0, item.checkState(0))
+    def replace_networks(self, networks, keys):
+        self.model().replace_networks(networks, keys)
 
-            if not channel.file_path:
-                icon = self.style().standardIcon(QtWidgets.QStyle.SP_DialogCancelButton)
-                child.setText(2, 'Not Found')
-            elif channel.exists:
-                icon = self.style().standardIcon(QtWidgets.QStyle.SP_MessageBoxWarning)
-                child.setText(2, 'Node exists')
-            else:
-                icon = self.style().standardIcon(QtWidgets.QStyle.SP_DialogApplyButton)
-
-            child.setSortData(2, channel.exists)
-            child.setIcon(2, icon)
-
-            children.append(child)
-
-        item.addChildren(children)
-        self.addTopLevelItem(item)
-
-        self.expandAll()
-        for i in range(self.header().count()):
-            self.resizeColumnToContents(i)
-        self.collapseAll()
+    def add_networks(self, networks):
+        # sorting lays out every row again, the networks are sorted once in sort_networks
+        self.model().add_networks(networks)
+
+        # the columns fit the first networks, resize_columns measures all of them
+        if not self.columns_resized:
+            self.resize_columns()
+
+    def sort_networks(self):
+        if self.isSortingEnabled():
+            header = self.header()
+            self.model().sort(header.sortIndicatorSection(), header.sortIndicatorOrder())
+
+    def resize_columns(self):
+        # measures the texts of all networks and channels once instead of laying out every row
+        model = self.model()
+        metrics = self.fontMetrics()
+        text_width = getattr(metrics, 'horizontalAdvance', None) or metrics.width
+        texts = [{header} for header in model.headers]
+        for item in model.items:
+            for column in range(len(texts)):
+                texts[column].add(model.network_text(item.network, column))
+            for channel in item.network.channels:
+                for column in range(len(texts)):
+                    texts[column].add(model.channel_text(channel, column))
+
+        # padding of the stylesheet, check boxes and icons
+        padding = 20 + self.style().pixelMetric(QtWidgets.QStyle.PM_SmallIconSize) + 8
+        header = self.header()
+        for column, column_texts in enumerate(texts):
+            width = max(text_width(text) for text in column_texts) + padding
+            if column == 0:
+                width += self.indentation() * 2 + padding
+            header.resizeSection(column, max(width, header.sectionSizeHint(column)))
+        self.columns_resized = True
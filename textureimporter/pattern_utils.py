@@ -0,0 +1,544 @@
+import os
+import re
+import sys
+import hashlib
+import json
+import logging
+import functools
+import threading
+import collections
+import multiprocessing
+try:
+    from concurrent import futures
+except ImportError:
+    # py2.7
+    futures = None
+
+
+TOKENS = ('mesh', 'material', 'udim')
+
+UDIM_REGEX = '[0-9]{4}'
+# $mesh and $material only match letters, digits, underscores and dashes, names such as 'My Mat' are skipped.
+# Dashes are replaced in node names.
+WILDCARD_REGEX = r'[\w\-]+?'
+
+# windows file names are case insensitive, glob behaves the same way
+FLAGS = re.IGNORECASE if os.name == 'nt' else 0
+
+
+def has_token(pattern, token):
+    return '${}'.format(token) in pattern
+
+
+def split_options(pattern):
+    """Splits a pattern into literal strings and lists of optional strings.
+
+    Parentheses without a pipe symbol become optional: '(.$udim)' has the
+    options ['.$udim', ''] and '(tx|jpg)' has the options ['tx', 'jpg'].
+    """
+
+    parts = []
+    position = 0
+    for match in re.finditer(r'\(([^()]*)\)', pattern):
+        if match.start() > position:
+            parts.append(pattern[position:match.start()])
+        options = match.group(1).split('|')
+        if len(options) == 1:
+            options.append('')
+        parts.append(options)
+        position = match.end()
+    if position < len(pattern):
+        parts.append(pattern[position:])
+    return parts
+
+
+class LRUCache(object):
+    # a bounded cache that drops the least recently used items, shared between threads
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.data = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            try:
+                value = self.data.pop(key)
+            except KeyError:
+                return default
+            self.data[key] = value
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.data.pop(key, None)
+            self.data[key] = value
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+    def __len__(self):
+        return len(self.data)
+
+
+def memoize(maxsize=1024):
+    # functools.lru_cache is not available in py2.7
+    def decorator(func):
+        cache = LRUCache(maxsize)
+        missing = object()
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items()))) if kwargs else args
+            value = cache.get(key, missing)
+            if value is missing:
+                value = func(*args, **kwargs)
+                cache.set(key, value)
+            return value
+
+        wrapper.cache = cache
+        return wrapper
+    return decorator
+
+
+class CompiledPattern(object):
+    """A config channel pattern compiled into a single anchored regex.
+
+    $mesh and $material are captured unless a name is given, $udim is always captured.
+    The rank of a match is the index of the option that matched for every optional group,
+    sorting by rank gives the same priority as the order the options are written in.
+    """
+
+    def __init__(self, pattern, mesh=None, material=None):
+        self.pattern = pattern
+        self.mesh = mesh
+        self.material = material
+        self.groups = {token: [] for token in TOKENS}
+        self.options = []
+
+        self._group_index = 0
+        self.regex = re.compile(self.to_regex(), FLAGS)
+
+    def to_regex(self):
+        regex = ''
+        for part in split_options(self.pattern):
+            if isinstance(part, list):
+                names = []
+                alternatives = []
+                for option in part:
+                    name = self._group_name('option')
+                    names.append(name)
+                    alternatives.append('(?P<{}>{})'.format(name, self.glob_to_regex(option)))
+                self.options.append(names)
+                regex += '(?:{})'.format('|'.join(alternatives))
+            else:
+                regex += self.glob_to_regex(part)
+        return '^{}$'.format(regex)
+
+    def glob_to_regex(self, text):
+        regex = ''
+        i = 0
+        while i < len(text):
+            char = text[i]
+            token = self._token(text, i)
+            if token:
+                regex += self.token_to_regex(token)
+                i += len(token) + 1
+                continue
+            if char == '*':
+                regex += '.*'
+            elif char == '?':
+                regex += '.'
+            elif char == '[':
+                end = text.find(']', i + 2)
+                if end == -1:
+                    regex += re.escape(char)
+                else:
+                    chars = text[i + 1:end].replace('\\', '\\\\')
+                    if chars.startswith('!'):
+                        chars = '^' + chars[1:]
+                    elif chars.startswith('^'):
+                        chars = '\\' + chars
+                    regex += '[{}]'.format(chars)
+                    i = end
+            else:
+                regex += re.escape(char)
+            i += 1
+        return regex
+
+    def token_to_regex(self, token):
+        if token == 'mesh' and self.mesh is not None:
+            return re.escape(self.mesh)
+        if token == 'material' and self.material is not None:
+            return re.escape(self.material)
+
+        name = self._group_name(token)
+        self.groups[token].append(name)
+        value = UDIM_REGEX if token == 'udim' else WILDCARD_REGEX
+        return '(?P<{}>{})'.format(name, value)
+
+    def match(self, file_name):
+        # glob does not match hidden files unless the pattern starts with a dot
+        if file_name.startswith('.') and not self.pattern.startswith('.'):
+            return
+
+        match = self.regex.match(file_name)
+        if not match:
+            return
+
+        values = {}
+        for token, names in self.groups.items():
+            value = None
+            for name in names:
+                group = match.group(name)
+                if group is None:
+                    continue
+                if value is None:
+                    value = group
+                elif group != value:
+                    # the same token has to resolve to the same value everywhere
+                    return
+            values[token] = value
+
+        rank = []
+        for names in self.options:
+            for i, name in enumerate(names):
+                if match.group(name) is not None:
+                    rank.append(i)
+                    break
+
+        udim_span = None
+        for name in self.groups['udim']:
+            if match.group(name) is not None:
+                udim_span = match.span(name)
+                break
+
+        return PatternMatch(
+            file_name,
+            mesh=self.mesh if self.mesh is not None else values['mesh'],
+            material=self.material if self.material is not None else values['material'],
+            udim=values['udim'],
+            udim_span=udim_span,
+            rank=tuple(rank))
+
+    def _token(self, text, i):
+        if text[i] != '$':
+            return
+        for token in TOKENS:
+            if text.startswith(token, i + 1):
+                return token
+
+    def _group_name(self, prefix):
+        self._group_index += 1
+        return '{}_{}'.format(prefix, self._group_index)
+
+
+class PatternMatch(object):
+    __slots__ = ('file_name', 'mesh', 'material', 'udim', 'udim_span', 'rank', 'order', 'directory')
+
+    def __init__(self, file_name, mesh=None, material=None, udim=None, udim_span=None, rank=(), order=0):
+        self.file_name = file_name
+        self.directory = ''
+        self.mesh = mesh
+        self.material = material
+        self.udim = udim
+        self.udim_span = udim_span
+        self.rank = rank
+        self.order = order
+
+    def to_list(self):
+        return [
+            self.file_name, self.directory, self.mesh, self.material, self.udim,
+            self.udim_span, self.rank, self.order]
+
+    @classmethod
+    def from_list(cls, data):
+        file_name, directory, mesh, material, udim, udim_span, rank, order = data
+        match = cls(
+            file_name,
+            mesh=mesh,
+            material=material,
+            udim=udim,
+            udim_span=tuple(udim_span) if udim_span else None,
+            rank=tuple(rank),
+            order=order)
+        match.directory = directory
+        return match
+
+    @property
+    def sort_key(self):
+        # options written first win, files listed first win within the same option
+        return (self.rank, self.order)
+
+    @property
+    def udim_file_name(self):
+        # replace the matched udim with the <UDIM> tag that dccs understand
+        if self.udim_span is None:
+            return self.file_name
+        start, end = self.udim_span
+        return '{}<UDIM>{}'.format(self.file_name[:start], self.file_name[end:])
+
+    @property
+    def udim_path(self):
+        # file path relative to the scanned folder
+        if not self.directory:
+            return self.udim_file_name
+        return os.path.join(self.directory, self.udim_file_name)
+
+
+@memoize(maxsize=1024)
+def compile_pattern(pattern, mesh=None, material=None):
+    # compiled patterns are only read after they are built and can be shared
+    return CompiledPattern(pattern, mesh, material)
+
+
+@memoize(maxsize=256)
+def pattern_tokens(patterns):
+    # the tokens that are used by any of the patterns
+    return frozenset(token for token in TOKENS if any(has_token(pattern, token) for pattern in patterns))
+
+
+def classification_key(patterns, mesh=None):
+    # identifies the classification of a listing for the scan cache
+    data = json.dumps([list(patterns), mesh])
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+def node_name(name):
+    # dashes are matched by $material but are not valid in node names, such as Chrome-Metal
+    return re.sub(r'\W', '_', name)
+
+
+def material_key(directory, material):
+    # materials of subfolders are kept apart by their folder
+    if material is None or not directory:
+        return material
+    return os.path.join(directory, material)
+
+
+class Classification(object):
+    """Buckets file paths by material and channel in a single pass.
+
+    The table has the form {material: {channel index: [matches]}}. Channels without
+    $material are stored under None and are shared by all materials. The materials
+    are collected from the first channel that contains $material.
+
+    Materials in subfolders are keyed by their folder, such as 'assetA/lod0/Body',
+    so same-named materials of different folders are separate networks and a
+    material only uses the files of its own folder.
+    """
+
+    def __init__(self, patterns, mesh=None):
+        self.patterns = list(patterns)
+        self.mesh = mesh
+        self.compiled_patterns = [compile_pattern(pattern, mesh) for pattern in self.patterns]
+        self.material_channels = [
+            i for i, pattern in enumerate(self.patterns) if has_token(pattern, 'material')]
+        self.key_channel = self.material_channels[0] if self.material_channels else None
+
+        self.materials = []
+        self.table = {}
+        self._materials = set()
+        # material name: number of folders it was found in
+        self._names = collections.Counter()
+        self._count = 0
+
+    @property
+    def key(self):
+        return classification_key(self.patterns, self.mesh)
+
+    def to_dict(self):
+        table = []
+        for material, channels in self.table.items():
+            for index, matches in channels.items():
+                table.append([material, index, [match.to_list() for match in matches]])
+
+        data = {
+            'patterns': self.patterns,
+            'mesh': self.mesh,
+            'materials': self.materials,
+            'count': self._count,
+            'table': table,
+        }
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        classification = cls(data.get('patterns', []), mesh=data.get('mesh'))
+        for material in data.get('materials', []):
+            classification.add_material(material)
+        classification._count = data.get('count', 0)
+        for material, index, matches in data.get('table', []):
+            channels = classification.table.setdefault(material, {})
+            channels[index] = [PatternMatch.from_list(match) for match in matches]
+        return classification
+
+    def add(self, file_path):
+        # patterns match file names, subfolders are kept on the match
+        order = self._count
+        self._count += 1
+        directory, file_name = os.path.split(file_path)
+
+        for i, compiled_pattern in enumerate(self.compiled_patterns):
+            match = compiled_pattern.match(file_name)
+            if not match:
+                continue
+            match.order = order
+            match.directory = directory
+
+            material = material_key(directory, match.material)
+            if material not in self.table:
+                self.table[material] = {}
+            self.table[material].setdefault(i, []).append(match)
+
+            if i == self.key_channel:
+                self.add_material(material)
+
+    def extend(self, file_paths):
+        for file_path in file_paths:
+            self.add(file_path)
+
+    def add_material(self, material):
+        if material not in self._materials:
+            self._materials.add(material)
+            self.materials.append(material)
+            self._names[os.path.basename(material)] += 1
+
+    def remove_material(self, material):
+        if material in self._materials:
+            self._materials.discard(material)
+            self.materials.remove(material)
+            self._names[os.path.basename(material)] -= 1
+
+    def update(self, added=(), removed=()):
+        """Adds and removes file paths and returns the materials whose matches changed.
+
+        None in the returned set means that a channel without $material changed,
+        which affects every material.
+        """
+
+        materials = set()
+        for file_path in removed:
+            directory, file_name = os.path.split(file_path)
+            for i, compiled_pattern in enumerate(self.compiled_patterns):
+                match = compiled_pattern.match(file_name)
+                if not match:
+                    continue
+                material = material_key(directory, match.material)
+                channels = self.table.get(material, {})
+                channels[i] = [
+                    m for m in channels.get(i, [])
+                    if m.file_name != file_name or m.directory != directory]
+                materials.add(material)
+
+        for file_path in added:
+            directory, file_name = os.path.split(file_path)
+            for compiled_pattern in self.compiled_patterns:
+                match = compiled_pattern.match(file_name)
+                if match:
+                    materials.add(material_key(directory, match.material))
+            self.add(file_path)
+
+        # materials without any files of the key channel are gone
+        for material in materials:
+            if material in self._materials and not self.table.get(material, {}).get(self.key_channel):
+                self.remove_material(material)
+        return materials
+
+    def merge(self, other):
+        # other has to be classified from the file paths that follow this classification
+        for material in other.materials:
+            self.add_material(material)
+        for material, channels in other.table.items():
+            table_channels = self.table.setdefault(material, {})
+            for index, matches in channels.items():
+                table_channels.setdefault(index, []).extend(matches)
+        self._count = max(self._count, other._count)
+
+    def material_name(self, material):
+        # the folder is only added to names that were found in several folders
+        name = os.path.basename(material)
+        directory = os.path.dirname(material)
+        if directory and self._names[name] > 1:
+            name = '{}_{}'.format(re.sub(r'\W+', '_', directory).strip('_'), name)
+        return node_name(name)
+
+    def matches(self, material, index):
+        if index in self.material_channels:
+            return self.table.get(material, {}).get(index, [])
+
+        # shared files in the folder of the material are preferred
+        matches = self.table.get(None, {}).get(index, [])
+        directory = os.path.dirname(material or '')
+        if directory:
+            matches = [match for match in matches if match.directory == directory] or matches
+        return matches
+
+    def best_match(self, material, index):
+        matches = self.matches(material, index)
+        if not matches:
+            return
+        return min(matches, key=lambda match: match.sort_key)
+
+    def udims(self, material, index):
+        match = self.best_match(material, index)
+        if not match or match.udim is None:
+            return []
+
+        udim_path = match.udim_path
+        udims = set(
+            m.udim for m in self.matches(material, index)
+            if m.udim is not None and m.udim_path == udim_path)
+        return sorted(udims)
+
+
+def classify_shard(patterns, mesh, file_paths, offset):
+    # runs in a worker process, the order continues from the offset of the shard
+    classification = Classification(patterns, mesh=mesh)
+    classification._count = offset
+    classification.extend(file_paths)
+    return classification.to_dict()
+
+
+def processes_available():
+    # dccs such as maya or 3ds max would start a new instance of the application per process
+    executable = os.path.basename(sys.executable or '').lower()
+    return bool(futures) and executable.startswith(('python', 'mayapy'))
+
+
+def classify_parallel(patterns, file_paths, mesh=None, processes=None, min_shard_size=5000):
+    """Classifies file paths in a process pool and merges the tables.
+
+    The file paths are split into one shard per process. Falls back to classifying
+    in the current process when multiprocessing is not available or fails.
+    """
+
+    file_paths = list(file_paths)
+    processes = processes or multiprocessing.cpu_count()
+    processes = min(processes, max(1, len(file_paths) // min_shard_size))
+
+    classification = Classification(patterns, mesh=mesh)
+    if processes < 2 or not processes_available():
+        classification.extend(file_paths)
+        return classification
+
+    shard_size = -(-len(file_paths) // processes)
+    offsets = list(range(0, len(file_paths), shard_size))
+    try:
+        with futures.ProcessPoolExecutor(max_workers=processes) as executor:
+            shards = list(executor.map(
+                classify_shard,
+                [classification.patterns] * len(offsets),
+                [mesh] * len(offsets),
+                [file_paths[offset:offset + shard_size] for offset in offsets],
+                offsets))
+    except Exception as e:
+        logging.debug('Multiprocessing failed, classifying sequentially: {}'.format(e))
+        classification.extend(file_paths)
+        return classification
+
+    for shard in shards:
+        classification.merge(Classification.from_dict(shard))
+    return classification
@@ -3,9 +3,19 @@ import pkgutil
 import sys
 import logging
 import re
+import os
+import json
 from PySide2 import QtWidgets
 
 from . import plugins
+from . import utils
+
+
+# {plugin: module name}, the plugins package is only walked once per session
+_plugins = None
+# {(class name, plugin): class}
+_plugin_classes = {}
+_manifest = None
 
 
 def dcc_plugins():
@@ -15,11 +25,13 @@ def dcc_plugins():
 
 
 def all_plugins():
-    _plugins = {}
-    for finder, name, ispkg in iter_namespace(plugins):
-        _plugins[name.split('.')[-1]] = name
+    global _plugins
+    if _plugins is None:
+        _plugins = {}
+        for finder, name, ispkg in iter_namespace(plugins):
+            _plugins[name.split('.')[-1]] = name
 
-    return _plugins
+    return dict(_plugins)
 
 
 def render_plugins(dcc):
@@ -46,7 +58,21 @@ def iter_namespace(ns_pkg):
     return pkgutil.iter_modules(ns_pkg.__path__, ns_pkg.__name__ + '.')
 
 
+def plugin_module(plugin):
+    plugin = '.{}'.format(plugin)
+    package = '{}.plugins'.format(__package__ or '')
+    try:
+        return importlib.import_module(plugin, package=package)
+    except ImportError as e:
+        logging.error(e)
+        logging.error('Could not find plugin: "{}{}"'.format(package, plugin))
+
+
 def plugin_class(cls, plugin):
+    key = (cls.__name__, plugin)
+    if key in _plugin_classes:
+        return _plugin_classes[key]
+
     plugin = '.{}'.format(plugin)
     package = '{}.plugins'.format(__package__ or '')
     try:
@@ -57,4 +83,102 @@ def plugin_class(cls, plugin):
         logging.error(
             'Could not find plugin: "{}{}" '
             'Using base class instead.'.format(package, plugin))
+    else:
+        # only found classes are kept, a failed import is tried again
+        _plugin_classes[key] = cls
     return cls
+
+
+def plugin_info(cls, plugin):
+    """Returns the PluginInfo of a plugin, the plugin is only imported when it changed."""
+
+    global _manifest
+    if _manifest is None:
+        _manifest = PluginManifest(os.path.join(utils.Settings().settings_path, 'plugins.json'))
+    return _manifest.info(cls, plugin)
+
+
+def plugin_stamp(plugin):
+    # the modification times of the plugin and the dcc module it is based on
+    names = [plugin.split('_')[0]]
+    if plugin not in names:
+        names.append(plugin)
+
+    stamp = []
+    for name in names:
+        for path in plugins.__path__:
+            file_path = os.path.join(path, '{}.py'.format(name))
+            if os.path.isfile(file_path):
+                stamp.append(os.path.getmtime(file_path))
+                break
+        else:
+            return
+    return stamp
+
+
+class PluginInfo(object):
+    def __init__(self, display_name='', attributes=(), colorspaces=()):
+        self.display_name = display_name
+        self.attributes = list(attributes)
+        self.colorspaces = list(colorspaces)
+
+    def to_dict(self):
+        return {
+            'display_name': self.display_name,
+            'attributes': self.attributes,
+            'colorspaces': self.colorspaces,
+        }
+
+
+class PluginManifest(object):
+    """Stores the attributes and colorspaces of the plugins in a json file.
+
+    The dialog reads them from the manifest so renderer plugins are not imported
+    until they are used. An entry is read again when the plugin files change.
+    """
+
+    version = 1
+
+    def __init__(self, path):
+        self.path = path
+        self._entries = None
+
+    @property
+    def entries(self):
+        if self._entries is None:
+            self._entries = {}
+            try:
+                with open(self.path) as f:
+                    data = json.load(f)
+                if data.get('version') == self.version:
+                    self._entries = data.get('plugins', {})
+            except (IOError, OSError, ValueError):
+                pass
+        return self._entries
+
+    def save(self):
+        data = {
+            'version': self.version,
+            'plugins': self.entries,
+        }
+        try:
+            with open(self.path, 'w') as f:
+                json.dump(data, f, indent=4)
+        except (IOError, OSError):
+            logging.debug('Could not write plugin manifest: {}'.format(self.path))
+
+    def info(self, cls, plugin):
+        stamp = plugin_stamp(plugin)
+        entry = self.entries.get(plugin)
+        if stamp and entry and entry.get('stamp') == stamp:
+            return PluginInfo(**entry['info'])
+
+        plugin_cls = plugin_class(cls, plugin)
+        # the properties are static, an instance without __init__ does not create settings
+        instance = plugin_cls.__new__(plugin_cls)
+        info = PluginInfo(instance.display_name, instance.attributes, instance.colorspaces)
+
+        if stamp and plugin_cls is not cls:
+            self.entries[plugin] = {'stamp': stamp, 'info': info.to_dict()}
+            self.save()
+        return info
@@ -7,9 +7,39 @@ import re
 from textureimporter import importer_dialog
 from .. import importer
 from .. import setup
+from .. import timing_utils
 
 import pymxs
-rt = pymxs.runtime
+# calls are counted in the timings of the current run
+rt = timing_utils.CallCounter(pymxs.runtime)
+
+# events that add or remove scene materials, the material snapshots are rebuilt after any of them
+SCENE_CALLBACKS = (
+    'filePostOpen', 'filePostMerge', 'systemPostNew', 'systemPostReset',
+    'nodeCreated', 'nodePostDelete', 'mtlRefAdded', 'mtlRefDeleted', 'sceneUndo', 'sceneRedo')
+CALLBACK_ID = 'textureImporter'
+
+# incremented by the scene callbacks
+_scene_generation = 0
+_callbacks_registered = False
+
+
+def scene_changed(*args):
+    global _scene_generation
+    _scene_generation += 1
+
+
+def register_callbacks():
+    global _callbacks_registered
+    if _callbacks_registered:
+        return
+
+    # callbacks of a previously imported version of this module are replaced
+    callback_id = rt.Name(CALLBACK_ID)
+    rt.callbacks.removeScripts(id=callback_id)
+    for event in SCENE_CALLBACKS:
+        rt.callbacks.addScript(rt.Name(event), scene_changed, id=callback_id)
+    _callbacks_registered = True
 
 
 def run():
@@ -30,6 +60,7 @@ class Importer(importer.Importer):
     display_name = ''
     plugin_name = ''
     settings_group = 'max'
+    dcc_modules = (rt, )
     settings_defaults = {
         'material_node_pattern': '{}_mat',
         'file_node_pattern': '{}_tex',
@@ -40,6 +71,8 @@ class Importer(importer.Importer):
 
     def __init__(self):
         super(Importer, self).__init__()
+        self._scene_materials = None
+        self._scene_generation = None
 
     @property
     def attributes(self):
@@ -67,28 +100,32 @@ class Importer(importer.Importer):
             raise RuntimeError
 
     def get_meshes(self):
-        # force update scene materials
-        self.update_scene_materials()
-
         meshes = [Mesh(mesh) for mesh in rt.selection]
         return meshes
 
     def get_material(self, material_name):
-        material = None
-        for scene_material in rt.sceneMaterials:
-            if scene_material.name == material_name:
-                material = scene_material
-                break
-        return material
+        return self.scene_materials().get(material_name)
 
     def exists(self, node_name):
-        material_names = [mat.name for mat in rt.sceneMaterials]
-        return node_name in material_names
-
-    def update_scene_materials(self):
-        temp_path = os.path.join(rt.GetDir(rt.name('temp')), 'textureimporter.max')
-        rt.saveNodes([], temp_path, quiet=True)
-        rt.deleteFile(temp_path)
+        return node_name in self.scene_materials()
+
+    def exists_many(self, node_names):
+        return set(self.scene_materials()).intersection(node_names)
+
+    def scene_materials(self):
+        # snapshot of the scene materials by name, rebuilt only after the scene changed
+        register_callbacks()
+        if self._scene_materials is None or self._scene_generation != _scene_generation:
+            self._scene_generation = _scene_generation
+            self._scene_materials = {}
+            # rt.sceneMaterials is only updated when the scene is saved or the library is updated
+            rt.UpdateSceneMaterialLib()
+            for scene_material in rt.sceneMaterials:
+                self._scene_materials.setdefault(scene_material.name, scene_material)
+        return self._scene_materials
+
+    def clear_scene_materials(self):
+        self._scene_materials = None
 
     def create_network(self, network, **kwargs):
         self.current_network = network
@@ -130,9 +167,13 @@ class Importer(importer.Importer):
         rt.meditmaterials[kwargs['index']] = material_node
 
         rt.select(selection)
+        self.clear_scene_materials()
         self.current_network = None
         self.current_kwargs = None
 
+    def save_scene(self, path):
+        rt.saveMaxFile(path, quiet=True)
+
     def create_material(self, material_node_name):
         material = self.create_node('PhysicalMaterial', name=material_node_name)
 
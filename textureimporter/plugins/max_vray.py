@@ -1,9 +1,7 @@
 from __future__ import absolute_import
 
 from . import max
-
-import pymxs
-rt = pymxs.runtime
+from .max import rt
 
 
 class Importer(max.Importer):
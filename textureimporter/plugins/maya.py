@@ -2,12 +2,17 @@ from __future__ import absolute_import
 import sys
 from PySide2 import QtWidgets
 from textureimporter import importer_dialog
-from maya import mel, cmds
+from maya import mel as maya_mel, cmds as maya_cmds
 from .. import importer
 from .. import setup
+from .. import timing_utils
 import logging
 import os
 
+# calls are counted in the timings of the current run
+cmds = timing_utils.CallCounter(maya_cmds)
+mel = timing_utils.CallCounter(maya_mel)
+
 
 def run():
     app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv)
@@ -17,10 +22,20 @@ def run():
     return main_window
 
 
+def initialize():
+    # commands are only available in mayapy after the standalone module is initialized
+    try:
+        cmds.about(batch=True)
+    except AttributeError:
+        import maya.standalone
+        maya.standalone.initialize()
+
+
 class Importer(importer.Importer):
     display_name = ''
     plugin_name = ''
     settings_group = 'maya'
+    dcc_modules = (cmds, mel)
     settings_defaults = {
         'material_node_pattern': '{}_mat',
         'shadingengine_node_pattern': '{}_sg',
@@ -28,10 +43,14 @@ class Importer(importer.Importer):
         'place_node_pattern': '{}_place',
         'normal_node_pattern': '{}_normal',
         'default_name': 'default',
+        'share_place_node': False,
         }
 
     def __init__(self):
         super(Importer, self).__init__()
+        self.selected_meshes = None
+        self.shared_place_node = None
+        self.pending_connections = None
 
     @property
     def attributes(self):
@@ -71,13 +90,61 @@ class Importer(importer.Importer):
         meshes = [Mesh(mesh) for mesh in meshes]
         return meshes
 
+    def get_geometry(self, nodes):
+        # only shapes can be assigned, cameras, lights or materials in the selection are skipped
+        if not nodes:
+            return []
+        return cmds.ls(nodes, dag=True, type='surfaceShape', noIntermediate=True, long=True) or []
+
     def exists(self, node_name):
         return cmds.objExists(node_name)
 
+    def exists_many(self, node_names):
+        node_names = [node_name for node_name in node_names if node_name]
+        if not node_names:
+            return set()
+        # ls ignores names that don't exist, non unique names are returned as paths
+        nodes = cmds.ls(node_names) or []
+        return set(node.rsplit('|', 1)[-1] for node in nodes)
+
+    def create_networks(self, networks, **kwargs):
+        # all networks are created in a single undo chunk and the selection is only restored once
+        selection = cmds.ls(selection=True)
+        self.selected_meshes = self.get_geometry([mesh.mesh for mesh in self.get_meshes()])
+        # place connections are collected and made in bulk at the end
+        self.pending_connections = []
+        cmds.undoInfo(openChunk=True, chunkName='textureimporter')
+        try:
+            if self.settings.bool('{}/share_place_node'.format(self.settings_group)):
+                self.naming = self.read_naming()
+                place_name = self.resolve_name('place_node_pattern', 'shared')
+                if self.exists(place_name) and cmds.nodeType(place_name) == 'place2dTexture':
+                    # networks of earlier imports are still connected to the shared node
+                    self.shared_place_node = place_name
+                else:
+                    # without on_conflict the node is never removed or replaced
+                    self.current_kwargs = {}
+                    self.shared_place_node = self.create_place(place_name)
+                    self.current_kwargs = None
+
+            super(Importer, self).create_networks(networks, **kwargs)
+        finally:
+            # networks that were created before an error still get their place connections
+            try:
+                self.apply_connections()
+            finally:
+                self.selected_meshes = None
+                self.shared_place_node = None
+                self.pending_connections = None
+                if selection:
+                    cmds.select(selection, replace=True)
+                else:
+                    cmds.select(clear=True)
+                cmds.undoInfo(closeChunk=True)
+
     def create_network(self, network, **kwargs):
         self.current_network = network
         self.current_kwargs = kwargs
-        selection = cmds.ls(selection=True)
 
         set_members = []
         if kwargs.get('assign_material') and self.exists(network.material_node_name):
@@ -92,8 +159,11 @@ class Importer(importer.Importer):
         shadingengine_node_name = self.resolve_name('shadingengine_node_pattern', network.material_name)
         material_node, shadingengine_node = self.create_material(network.material_node_name, shadingengine_node_name)
 
-        place_name = self.resolve_name('place_node_pattern', network.material_name)
-        place_node = self.create_place(place_name)
+        if self.shared_place_node:
+            place_node = self.shared_place_node
+        else:
+            place_name = self.resolve_name('place_node_pattern', network.material_name)
+            place_node = self.create_place(place_name)
 
         for channel in network.channels:
             if not channel.file_node_name:
@@ -110,19 +180,26 @@ class Importer(importer.Importer):
                     'Could not connect material attribute: '
                     '{}.{}'.format(material_node, attribute_name))
 
-        cmds.select(selection, replace=True)
         if kwargs.get('assign_material'):
             if set_members:
-                self.assign_material(material_node, set_members)
+                self.assign_material(material_node, set_members, shadingengine_node)
             elif network.mesh:
-                self.assign_material(material_node, network.mesh)
+                self.assign_material(material_node, self.get_geometry([network.mesh.mesh]), shadingengine_node)
             else:
-                self.assign_material(material_node, [mesh.mesh for mesh in self.get_meshes()])
+                if self.selected_meshes is None:
+                    meshes = self.get_geometry([mesh.mesh for mesh in self.get_meshes()])
+                else:
+                    meshes = self.selected_meshes
+                self.assign_material(material_node, meshes, shadingengine_node)
 
-        cmds.select(selection, replace=True)
         self.current_network = None
         self.current_kwargs = None
 
+    def save_scene(self, path):
+        file_type = 'mayaBinary' if path.lower().endswith('.mb') else 'mayaAscii'
+        cmds.file(rename=path)
+        cmds.file(save=True, type=file_type, force=True)
+
     def create_material(self, material_node_name, shadingengine_node_name):
         material_node = self.create_node('lambert', name=material_node_name, asShader=True)
         shadingengine_node = self.create_node(
@@ -177,7 +254,20 @@ class Importer(importer.Importer):
         for place_attr, file_attribute in attributes:
             out_connection = '{}.{}'.format(place_node, place_attr)
             in_connection = '{}.{}'.format(file_node, file_attribute)
-            cmds.connectAttr(out_connection, in_connection, force=True)
+            if self.pending_connections is None:
+                cmds.connectAttr(out_connection, in_connection, force=True)
+            else:
+                self.pending_connections.append((out_connection, in_connection))
+
+    def apply_connections(self, chunk_size=1000):
+        # one mel call connects a whole chunk instead of one python command per connection
+        connections = self.pending_connections or []
+        self.pending_connections = []
+        for i in range(0, len(connections), chunk_size):
+            commands = [
+                'connectAttr -f "{}" "{}";'.format(out_connection, in_connection)
+                for out_connection, in_connection in connections[i:i + chunk_size]]
+            mel.eval('\n'.join(commands))
 
     def connect_file(self, file_node, material_node, material_attribute):
         if cmds.getAttr('{}.{}'.format(material_node, material_attribute), type=True) == 'float':
@@ -194,7 +284,8 @@ class Importer(importer.Importer):
         if node_type == 'shadingEngine':
             node = cmds.sets(**kwargs)
         else:
-            node = cmds.shadingNode(node_type, **kwargs)
+            # new nodes are not selected to avoid selection changes during the import
+            node = cmds.shadingNode(node_type, skipSelect=True, **kwargs)
 
         on_conflict = self.current_kwargs.get('on_conflict')
         if on_conflict in ('replace', 'remove'):
@@ -240,12 +331,17 @@ class Importer(importer.Importer):
                         pass
         return node
 
-    def assign_material(self, material, meshes):
-        selection = cmds.ls(selection=True)
-        cmds.select(meshes, replace=True)
-        if cmds.ls(selection=True):
-            cmds.hyperShade(assign=material)
-        cmds.select(selection, replace=True)
+    def assign_material(self, material, meshes, shadingengine_node=None):
+        if not meshes:
+            return
+        if shadingengine_node is None:
+            outputs = cmds.listConnections(
+                material, destination=True, source=False, type='shadingEngine')
+            if not outputs:
+                return
+            shadingengine_node = outputs[0]
+        # assigning through the set does not need to change the selection
+        cmds.sets(meshes, edit=True, forceElement=shadingengine_node)
 
 
 class Mesh(importer.Mesh):
@@ -1,8 +1,8 @@
 from __future__ import absolute_import
 
-from maya import cmds
 import logging
 from . import maya
+from .maya import cmds
 
 
 class Importer(maya.Importer):
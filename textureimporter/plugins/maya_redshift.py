@@ -1,8 +1,8 @@
 from __future__ import absolute_import
 
-from maya import cmds
 import logging
 from . import maya
+from .maya import cmds
 
 
 class Importer(maya.Importer):
@@ -152,7 +152,7 @@ class Importer(maya.Importer):
     def connect_file(self, file_node, material_node, material_attribute):
         if material_attribute == 'normal_input':
             normal_node_name = self.resolve_name('normal_node_pattern', self.current_network.material_name)
-            normal_node = cmds.shadingNode('RedshiftBumpMap', name=normal_node_name, asUtility=True)
+            normal_node = cmds.shadingNode('RedshiftBumpMap', name=normal_node_name, asUtility=True, skipSelect=True)
 
             out_connection = '{}.outColor'.format(file_node)
             in_connection = '{}.input'.format(normal_node)
@@ -0,0 +1,390 @@
+import os
+import time
+import collections
+import fnmatch
+import hashlib
+import json
+import logging
+
+try:
+    from os import scandir
+except ImportError:
+    # py2.7
+    scandir = None
+
+
+def is_ignored(name, ignore_patterns):
+    for pattern in ignore_patterns:
+        if fnmatch.fnmatch(name, pattern):
+            return True
+    return False
+
+
+def list_directory(path):
+    """Returns the names of files and folders in a directory with a single scan."""
+
+    files = []
+    directories = []
+    if scandir:
+        try:
+            iterator = scandir(path)
+        except OSError:
+            return files, directories
+        try:
+            for entry in iterator:
+                try:
+                    if entry.is_file():
+                        files.append(entry.name)
+                    elif entry.is_dir() and not entry.is_symlink():
+                        directories.append(entry.name)
+                except OSError:
+                    continue
+        finally:
+            # scandir iterators only have a close method in py3.6+
+            if hasattr(iterator, 'close'):
+                iterator.close()
+    else:
+        try:
+            names = os.listdir(path)
+        except OSError:
+            return files, directories
+        for name in names:
+            entry_path = os.path.join(path, name)
+            if os.path.isfile(entry_path):
+                files.append(name)
+            elif os.path.isdir(entry_path) and not os.path.islink(entry_path):
+                directories.append(name)
+    return files, directories
+
+
+def directory_stamp(path):
+    # the modification time of a folder changes when files are added, removed or renamed
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return
+    return [stat.st_mtime, stat.st_ino]
+
+
+def walk(path, recursive=True, max_depth=None, ignore_patterns=(), directories=None):
+    """Yields file paths relative to path while the tree is being scanned.
+
+    Folders are visited breadth first so files closer to the root come first.
+    Hidden and ignored folders are pruned before they are listed.
+
+    Args:   path: the root folder
+            recursive: whether subfolders are scanned
+            max_depth: the number of subfolder levels below the root, None for no limit
+            ignore_patterns: glob patterns for file and folder names that are skipped
+            directories: a dictionary that stores the stamp of every scanned folder
+    """
+
+    queue = collections.deque([('', 0)])
+    while queue:
+        relative_path, depth = queue.popleft()
+        directory_path = os.path.join(path, relative_path)
+        if directories is not None:
+            # stamp before listing so changes during the scan invalidate the cache
+            directories[relative_path] = directory_stamp(directory_path)
+        files, folders = list_directory(directory_path)
+
+        for name in files:
+            if is_ignored(name, ignore_patterns):
+                continue
+            yield os.path.join(relative_path, name) if relative_path else name
+
+        if not recursive or (max_depth is not None and depth >= max_depth):
+            continue
+
+        for name in folders:
+            if name.startswith('.') or is_ignored(name, ignore_patterns):
+                continue
+            queue.append((os.path.join(relative_path, name), depth + 1))
+
+
+class DirectoryIndex(object):
+    """Listing of a directory that is scanned once and queried in memory.
+
+    The listing is built lazily: iterating the index streams file paths from the
+    scan while they are stored, so matching can start before the whole tree is walked.
+    """
+
+    def __init__(self, path, recursive=False, max_depth=None, ignore_patterns=()):
+        self.path = path
+        self.recursive = recursive
+        self.max_depth = max_depth
+        self.ignore_patterns = list(ignore_patterns)
+
+        self.scan()
+
+    def scan(self):
+        self._names = []
+        self._files_by_directory = None
+        self.directories = {}
+        self.complete = False
+
+        if not self.path or not os.path.isdir(self.path):
+            self._walker = iter([])
+        else:
+            self._walker = walk(
+                self.path,
+                recursive=self.recursive,
+                max_depth=self.max_depth,
+                ignore_patterns=self.ignore_patterns,
+                directories=self.directories)
+
+    def restore(self, names, directories):
+        self._names = list(names)
+        self._files_by_directory = None
+        self.directories = dict(directories)
+        self._walker = iter([])
+        self.complete = True
+
+    @property
+    def key(self):
+        # the options that change the listing of a path
+        return [
+            os.path.normcase(os.path.abspath(self.path)),
+            self.recursive,
+            self.max_depth,
+            self.ignore_patterns]
+
+    def load(self):
+        for name in self:
+            pass
+
+    @property
+    def names(self):
+        self.load()
+        return self._names
+
+    @property
+    def files_by_directory(self):
+        # {relative folder: set of file paths}, built on the first change
+        if self._files_by_directory is None:
+            self._files_by_directory = {}
+            for name in self.names:
+                self._files_by_directory.setdefault(os.path.dirname(name), set()).add(name)
+        return self._files_by_directory
+
+    def refresh_directory(self, relative_path):
+        """Lists a folder of the index again and returns the added and removed file paths.
+
+        New subfolders are walked and the files of removed subfolders are dropped,
+        so the cost depends on the changed folder and not on the whole tree.
+        """
+
+        added = []
+        removed = []
+        if relative_path not in self.directories:
+            return added, removed
+
+        files_by_directory = self.files_by_directory
+        directory_path = os.path.join(self.path, relative_path)
+        if not os.path.isdir(directory_path):
+            removed.extend(self.remove_directory(relative_path))
+        else:
+            self.directories[relative_path] = directory_stamp(directory_path)
+            files, folders = list_directory(directory_path)
+
+            previous_files = files_by_directory.get(relative_path, set())
+            current_files = set(
+                os.path.join(relative_path, name) for name in files
+                if not is_ignored(name, self.ignore_patterns))
+            added.extend(sorted(current_files - previous_files))
+            removed.extend(previous_files - current_files)
+            files_by_directory[relative_path] = current_files
+
+            depth = len(relative_path.split(os.sep)) + 1 if relative_path else 1
+            if self.recursive and (self.max_depth is None or depth <= self.max_depth):
+                current_folders = set(
+                    os.path.join(relative_path, name) for name in folders
+                    if not name.startswith('.') and not is_ignored(name, self.ignore_patterns))
+            else:
+                current_folders = set()
+
+            for folder in self.subdirectories(relative_path) - current_folders:
+                removed.extend(self.remove_directory(folder))
+            for folder in sorted(current_folders):
+                if folder not in self.directories:
+                    added.extend(self.add_directory(folder, depth))
+
+        if removed:
+            removed_files = set(removed)
+            self._names = [name for name in self._names if name not in removed_files]
+        if added:
+            self._names.extend(added)
+        return added, removed
+
+    def subdirectories(self, relative_path):
+        # the folders of the index directly below relative_path
+        return set(
+            directory for directory in self.directories
+            if directory and directory != relative_path and os.path.dirname(directory) == relative_path)
+
+    def add_directory(self, relative_path, depth):
+        directories = {}
+        max_depth = None if self.max_depth is None else self.max_depth - depth
+        added = []
+        for name in walk(
+                os.path.join(self.path, relative_path),
+                max_depth=max_depth,
+                ignore_patterns=self.ignore_patterns,
+                directories=directories):
+            file_path = os.path.join(relative_path, name)
+            self.files_by_directory.setdefault(os.path.dirname(file_path), set()).add(file_path)
+            added.append(file_path)
+        for directory, stamp in directories.items():
+            self.directories[os.path.join(relative_path, directory) if directory else relative_path] = stamp
+        return added
+
+    def remove_directory(self, relative_path):
+        removed = []
+        prefix = relative_path + os.sep
+        for directory in list(self.directories):
+            if not relative_path or directory == relative_path or directory.startswith(prefix):
+                del self.directories[directory]
+                removed.extend(self.files_by_directory.pop(directory, ()))
+        return removed
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        i = 0
+        while True:
+            if i < len(self._names):
+                yield self._names[i]
+                i += 1
+            elif self.complete:
+                return
+            else:
+                try:
+                    name = next(self._walker)
+                except StopIteration:
+                    self.complete = True
+                    return
+                self._names.append(name)
+
+
+class ScanCache(object):
+    """Stores directory listings and classifications on disk between sessions.
+
+    An entry is only used when the stamps of all scanned folders are unchanged.
+    Classifications are stored per config patterns and mesh. The least recently
+    used entries are removed once there are more than max_files or max_size bytes.
+    """
+
+    version = 3
+    max_classifications = 16
+    max_files = 256
+    max_size = 256 * 1024 * 1024
+
+    def __init__(self, path):
+        self.path = path
+
+    def file_path(self, index):
+        key = json.dumps(index.key)
+        name = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.path, '{}.json'.format(name))
+
+    def read(self, index):
+        file_path = self.file_path(index)
+        if not os.path.isfile(file_path):
+            return
+        try:
+            with open(file_path) as f:
+                data = json.load(f)
+        except (IOError, OSError, ValueError):
+            logging.debug('Could not read scan cache: {}'.format(file_path))
+            return
+
+        if data.get('version') != self.version or data.get('key') != index.key:
+            return
+        return data
+
+    def load(self, index):
+        """Restores the index from the cache and returns the stored classifications."""
+
+        data = self.read(index)
+        if not data:
+            return {}
+
+        directories = data.get('directories', {})
+        for relative_path, stamp in directories.items():
+            if directory_stamp(os.path.join(index.path, relative_path)) != stamp:
+                return {}
+
+        index.restore(data.get('names', []), directories)
+        # the modification time of an entry is the time it was last used
+        try:
+            os.utime(self.file_path(index), None)
+        except OSError:
+            pass
+        return data.get('classifications', {})
+
+    def save(self, index, classifications):
+        if not index.complete:
+            return
+
+        data = self.read(index)
+        if data and data.get('directories') == index.directories:
+            stored_classifications = data.get('classifications', {})
+        else:
+            stored_classifications = {}
+
+        now = time.time()
+        for key, classification in classifications.items():
+            stored_classifications[key] = dict(classification, time=now)
+
+        # drop the oldest classifications, json objects don't keep their order in py2.7
+        items = sorted(
+            stored_classifications.items(),
+            key=lambda item: (item[1].get('time', 0), item[0] in classifications))
+        for key, classification in items[:-self.max_classifications]:
+            del stored_classifications[key]
+
+        data = {
+            'version': self.version,
+            'key': index.key,
+            'directories': index.directories,
+            'names': index.names,
+            'classifications': stored_classifications,
+        }
+
+        file_path = self.file_path(index)
+        try:
+            if not os.path.isdir(self.path):
+                os.makedirs(self.path)
+            with open(file_path, 'w') as f:
+                json.dump(data, f)
+        except (IOError, OSError):
+            logging.error('Could not write scan cache: {}'.format(self.path))
+            return
+        self.prune(keep=file_path)
+
+    def prune(self, keep=None):
+        # removes the least recently used entries until the cache is within its limits
+        entries = []
+        try:
+            for name in os.listdir(self.path):
+                if not name.endswith('.json'):
+                    continue
+                file_path = os.path.join(self.path, name)
+                stat = os.stat(file_path)
+                entries.append((stat.st_mtime, stat.st_size, file_path))
+        except OSError:
+            return
+
+        entries.sort(reverse=True)
+        count = 0
+        size = 0
+        for mtime, file_size, file_path in entries:
+            count += 1
+            size += file_size
+            if file_path == keep or (count <= self.max_files and size <= self.max_size):
+                continue
+            try:
+                os.remove(file_path)
+            except OSError:
+                logging.debug('Could not remove scan cache: {}'.format(file_path))
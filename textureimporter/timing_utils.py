@@ -0,0 +1,116 @@
+import os
+import time
+import json
+import logging
+import threading
+import contextlib
+import collections
+
+
+# py2.7
+clock = getattr(time, 'perf_counter', time.time)
+
+
+class Timings(object):
+    """Adds up the time of named spans and counts events during a refresh or an import.
+
+    Spans can be entered from the worker and the main thread at the same time.
+    Only sums are kept, so the timings are cheap enough to always be enabled.
+    """
+
+    def __init__(self, name=''):
+        self.name = name
+        self.date = time.strftime('%Y-%m-%dT%H:%M:%S')
+        self.start_time = clock()
+        # name: [count, seconds]
+        self.spans = collections.OrderedDict()
+        self.counters = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def span(self, name):
+        start_time = clock()
+        try:
+            yield
+        finally:
+            self.add_span(name, clock() - start_time)
+
+    def add_span(self, name, seconds, count=1):
+        with self._lock:
+            span = self.spans.get(name)
+            if span is None:
+                span = self.spans[name] = [0, 0.0]
+            span[0] += count
+            span[1] += seconds
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    @property
+    def elapsed(self):
+        return clock() - self.start_time
+
+    def to_dict(self):
+        with self._lock:
+            data = {
+                'name': self.name,
+                'date': self.date,
+                'time': self.elapsed,
+                'spans': {name: {'count': count, 'time': seconds} for name, (count, seconds) in self.spans.items()},
+                'counters': dict(self.counters),
+            }
+        return data
+
+    def summary(self, limit=3):
+        # the slowest spans, such as "get_materials 1.20s, exists 0.40s (12x)"
+        with self._lock:
+            spans = sorted(self.spans.items(), key=lambda item: item[1][1], reverse=True)
+
+        parts = []
+        for name, (count, seconds) in spans[:limit]:
+            part = '{} {:.2f}s'.format(name, seconds)
+            if count > 1:
+                part += ' ({}x)'.format(count)
+            parts.append(part)
+        return ', '.join(parts)
+
+
+class CallCounter(object):
+    """Forwards attribute access to a dcc module such as maya.cmds or pymxs.runtime.
+
+    Every command or value that is looked up on the module counts as a dcc call
+    in the timings of the current run. Properties of returned nodes, such as
+    node.name in 3ds max, are not counted.
+    """
+
+    def __init__(self, module):
+        object.__setattr__(self, '_module', module)
+        object.__setattr__(self, 'timings', None)
+
+    def __getattr__(self, name):
+        timings = self.timings
+        if timings is not None:
+            timings.count('dcc_calls')
+        return getattr(self._module, name)
+
+    def __setattr__(self, name, value):
+        if name == 'timings':
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._module, name, value)
+
+
+def write_log(timings, path, max_size=1024 * 1024):
+    # one json object per line, the previous log is kept once it gets too large
+    try:
+        if os.path.isfile(path) and os.path.getsize(path) > max_size:
+            old_path = '{}.1'.format(path)
+            if os.path.isfile(old_path):
+                os.remove(old_path)
+            os.rename(path, old_path)
+        with open(path, 'a') as f:
+            f.write(json.dumps(timings.to_dict()))
+            f.write('\n')
+    except (IOError, OSError) as e:
+        logging.debug('Could not write timings: {}'.format(e))
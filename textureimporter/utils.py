@@ -53,7 +53,12 @@ class Settings(QtCore.QSettings):
     def init_defaults(self):
         default_values = {
             'num_recent_paths': 10,
-            'configs_path': ''
+            'configs_path': '',
+            'max_subfolder_depth': 3,
+            'ignore_patterns': ['.mayaSwatches', '_old'],
+            'use_scan_cache': True,
+            'classify_processes': 0,
+            'log_timings': True
         }
         for key, value in default_values.items():
             if key not in self.childKeys():
@@ -69,17 +74,20 @@ class Settings(QtCore.QSettings):
             else:
                 return bool(value)
 
-    def list(self, key):
+    def list(self, key, numbers=True):
+        # numbers=False keeps digit-only strings, such as a folder named 2019
         value = self.value(key, [])
         # py2.7
         try:
             if isinstance(value, basestring):
                 value = [value, ]
-            value = [int(i) if isinstance(i, basestring) and i.isdigit() else i for i in value]
+            if numbers:
+                value = [int(i) if isinstance(i, basestring) and i.isdigit() else i for i in value]
         except NameError:
             if isinstance(value, str):
                 value = [value, ]
-            value = [int(i) if isinstance(i, str) and i.isdigit() else i for i in value]
+            if numbers:
+                value = [int(i) if isinstance(i, str) and i.isdigit() else i for i in value]
 
         return value
 
@@ -94,3 +102,7 @@ class NoSelectionException(Exception):
 
 class NotFoundException(Exception):
     message = 'Not found.'
+
+
+class CancelledException(Exception):
+    message = 'Cancelled.'